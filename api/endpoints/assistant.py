@@ -1,25 +1,23 @@
-from typing import List
+import json
+import logging
+from typing import List, Optional
 from bson import ObjectId
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from core.database import get_chats_collection
 from core.security import get_current_active_user, get_current_user, get_current_user_email, get_current_user_id
 from models.domain import ChatRequest, ChatResponse
-from services.agent.brain import run_juristway_ai
+from services.agent.brain import agent_executor, run_juristway_ai, stream_juristway_ai
 from dotenv import load_dotenv
 load_dotenv()
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/chat", response_model=ChatResponse)
-async def send_message(
-    chat_request: ChatRequest,
-    current_user: dict = Depends(get_current_active_user)
-):
+async def _get_or_create_chat(chat_request: ChatRequest, user_id: str, now: datetime) -> dict:
     chats_collection = get_chats_collection()
-    user_id = str(current_user["_id"])
-    now = datetime.now(timezone.utc)
-    
+
     # 1. SESSION / CHAT RETRIEVAL
     if chat_request.chat_id:
         chat_doc = await chats_collection.find_one({"_id": ObjectId(chat_request.chat_id)})
@@ -37,19 +35,13 @@ async def send_message(
         result = await chats_collection.insert_one(new_chat)
         chat_doc = new_chat
         chat_doc["_id"] = result.inserted_id
+    return chat_doc
 
-    session_id = str(chat_doc["_id"])
-
-    # 2. GET AI RESPONSE (Orchestrator handles Redis + RAG)
-    ai_data = await run_juristway_ai(
-        query=chat_request.message, 
-        thread_id=session_id
-    )
-
+async def _save_exchange(chat_doc: dict, message: str, ai_data: dict, now: datetime):
     # 3. MESSAGE FORMATTING & PERSISTENCE
     user_msg_entry = {
         "role": "user", 
-        "content": chat_request.message, 
+        "content": message, 
         "timestamp": now
     }
     
@@ -65,7 +57,7 @@ async def send_message(
         "timestamp": datetime.now(timezone.utc)
     }
     
-    await chats_collection.update_one(
+    await get_chats_collection().update_one(
         {"_id": chat_doc["_id"]},
         {
             "$push": {"messages": {"$each": [user_msg_entry, assistant_msg_entry]}},
@@ -73,12 +65,43 @@ async def send_message(
         }
     )
 
-    raw_answer = ai_data.get("answer", "")
+def _plan_type(user: dict) -> str:
+    return user.get("plan") or user.get("subscription_tier") or "Free"
+
+def _filters(chat_request: ChatRequest) -> Optional[dict]:
+    if chat_request.filters is None:
+        return None
+    return chat_request.filters.model_dump(exclude_none=True) or None
+
+def _final_message(raw_answer) -> str:
     if isinstance(raw_answer, list) and len(raw_answer) > 0:
         # Get the text from the first block
-        final_message = raw_answer[0].get("text", "I'm sorry, I couldn't process that.")
-    else:
-        final_message = str(raw_answer)
+        return raw_answer[0].get("text", "I'm sorry, I couldn't process that.")
+    return str(raw_answer)
+
+@router.post("/chat", response_model=ChatResponse)
+async def send_message(
+    chat_request: ChatRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    user_id = str(current_user["_id"])
+    now = datetime.now(timezone.utc)
+    
+    chat_doc = await _get_or_create_chat(chat_request, user_id, now)
+    session_id = str(chat_doc["_id"])
+
+    # 2. GET AI RESPONSE (Orchestrator handles Redis + RAG)
+    ai_data = await run_juristway_ai(
+        query=chat_request.message, 
+        thread_id=session_id,
+        user_email=current_user.get("email"),
+        plan_type=_plan_type(current_user),
+        filters=_filters(chat_request)
+    )
+
+    await _save_exchange(chat_doc, chat_request.message, ai_data, now)
+
+    final_message = _final_message(ai_data.get("answer", ""))
     print(f"DEBUG FINAL RESPONSE: {final_message}") # Check in terminal
 
     return ChatResponse(
@@ -87,6 +110,53 @@ async def send_message(
         timestamp=datetime.now(timezone.utc)
     )
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+# Streaming variant: tokens aur tool progress Server-Sent Events ke roop mein
+@router.post("/chat/stream")
+async def stream_message(
+    chat_request: ChatRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    user_id = str(current_user["_id"])
+    now = datetime.now(timezone.utc)
+
+    chat_doc = await _get_or_create_chat(chat_request, user_id, now)
+    session_id = str(chat_doc["_id"])
+
+    async def event_stream():
+        yield _sse("start", {"chat_id": session_id})
+        try:
+            async for event, data in stream_juristway_ai(
+                query=chat_request.message,
+                thread_id=session_id,
+                user_email=current_user.get("email"),
+                plan_type=_plan_type(current_user),
+                filters=_filters(chat_request),
+            ):
+                if event == "done":
+                    # Stream khatam hone par poora message 'chats' mein save karo
+                    await _save_exchange(chat_doc, chat_request.message, data, now)
+                    yield _sse("done", {
+                        "message": _final_message(data.get("answer", "")),
+                        "source": data.get("source"),
+                        "link": data.get("link"),
+                        "chat_id": session_id,
+                        "timestamp": datetime.now(timezone.utc),
+                    })
+                else:
+                    yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Streaming chat failed for {session_id}: {e}")
+            yield _sse("error", {"message": "An error occurred while generating the response."})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/history", response_model=List[dict])
 async def get_chat_history(current_user: dict = Depends(get_current_active_user)):
     chats_collection = get_chats_collection()
@@ -128,6 +198,12 @@ async def delete_chat_thread(
                 status_code=404, 
                 detail="Thread not found or unauthorized access."
             )
+
+        # Persistent checkpointer se bhi thread ki history hatao
+        try:
+            await agent_executor.checkpointer.adelete_thread(chat_id)
+        except Exception as e:
+            logger.warning(f"Checkpoint cleanup failed for thread {chat_id}: {e}")
         
         return {"message": "Thread deleted successfully"}
         
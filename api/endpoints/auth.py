@@ -5,13 +5,14 @@ from typing import Optional
 import aiosmtplib
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, logger, status
 from fastapi.security import OAuth2PasswordRequestForm
-from core.security import verify_password, create_access_token, get_current_user, get_password_hash
+from core.security import aget_password_hash, averify_password, create_access_token, get_current_user, invalidate_user, needs_rehash
 from core.database import (
     get_users_collection,
     get_chats_collection,
     get_documents_collection,
     get_subscriptions_collection,
     get_token_usage_collection,
+    get_token_usage_daily_collection,
 )
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta, timezone
@@ -48,13 +49,19 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     print(f"DEBUG: Attempting login for: '{form_data.username}'")
     print(f"DEBUG: User found in DB: {True if user else False}")
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await averify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # BCRYPT_ROUNDS badla ho toh plain password abhi available hai, isi waqt rehash kar do
+    if needs_rehash(user["hashed_password"]):
+        new_hash = await aget_password_hash(form_data.password)
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        invalidate_user(email=user["email"])
+
     access_token = create_access_token(data={"sub": user["email"]})
     return {"access_token": access_token, "token_type": "bearer", "is_admin": user.get("is_admin", False)}
 
@@ -75,6 +82,7 @@ async def delete_my_account(current_user: dict = Depends(get_current_user)):
 
     # 1) delete primary user record
     await users_coll.delete_one({"_id": current_user["_id"]})
+    invalidate_user(email=user_email, user_id=user_id)
 
     # 2) delete associated data (best-effort, keyed by the schemas currently used)
     await chats_coll.delete_many({"user_id": user_id})
@@ -83,6 +91,7 @@ async def delete_my_account(current_user: dict = Depends(get_current_user)):
         await documents_coll.delete_many({"owner": user_email})
         await subscriptions_coll.delete_many({"user_email": user_email})
         await token_usage_coll.delete_many({"user_email": user_email})
+        await get_token_usage_daily_collection().delete_many({"user_email": user_email})
 
     return {"message": "Account deleted successfully"}
 
@@ -211,7 +220,7 @@ async def reset_password(payload: ResetPasswordRequest):
         raise HTTPException(status_code=400, detail="Invalid OTP/Token")
 
     # 6. Password Update
-    new_hash = get_password_hash(payload.new_password)
+    new_hash = await aget_password_hash(payload.new_password)
     await users_coll.update_one(
         {"_id": user["_id"]},
         {
@@ -219,6 +228,7 @@ async def reset_password(payload: ResetPasswordRequest):
             "$unset": {"password_reset_token_hash": "", "password_reset_expires_at": ""},
         },
     )
+    invalidate_user(email=user["email"])
 
     return {"message": "Password has been reset successfully"}
 
@@ -321,6 +331,7 @@ async def edit_profile(
     # Agar name pehle se wahi hai jo save kar rahe ho, toh modified_count 0 hoga
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user(email=current_user.get("email"))
 
     return {
         "status": "success", 
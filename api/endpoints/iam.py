@@ -2,7 +2,7 @@ import logging
 from typing import Optional
 from fastapi import APIRouter, HTTPException, status
 from models.domain import UserBase
-from core.security import get_password_hash
+from core.security import aget_password_hash
 from core.database import get_users_collection
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timezone
@@ -54,7 +54,7 @@ async def register_user(user_data: UserCreate):
     # --------------------------
 
     # 2. Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await aget_password_hash(user_data.password)
     
     # 3. Prepare the document for MongoDB
     new_user = {
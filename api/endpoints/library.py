@@ -2,13 +2,15 @@ import os
 import shutil
 from datetime import datetime, timezone
 import uuid
-from fastapi import APIRouter, Depends, Form, UploadFile, File, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, Form, UploadFile, File, HTTPException
 from fastapi.responses import FileResponse
 from typing import List
 from api.endpoints.management import admin_required
+from core.security import get_current_active_user
 from core.database import get_documents_collection, get_knowledge_base_collection
-from models.domain import DocumentOut
-from services.background.processor import process_document_job
+from models.domain import DocumentOut, LibrarySearchRequest
+from services.agent.tools import build_filter, search_points
+from services.background.queue_mgr import INGEST_DOCUMENT, enqueue_job
 from services.ingestion.pdf_engine import PDFManager
 
 router = APIRouter()
@@ -21,7 +23,6 @@ os.makedirs(STORAGE_DIR, exist_ok=True)
 
 @router.post("/content-library/upload", status_code=202)
 async def upload_admin_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: str = Form(...),
     current_admin:str = Depends(admin_required) # Ye ek string (email) hai
@@ -52,27 +53,56 @@ async def upload_admin_document(
         }
         await docs_coll.insert_one(new_doc)
 
-        # 3. Background task (Yahan fix kiya hai)
-        background_tasks.add_task(
-            process_document_job, 
-            temp_path, 
-            pdf_id, 
-            title, 
-            current_admin # ["email"] hata diya kyunki current_admin hi email hai
-        )
+        # 3. Durable queue: doc worker process (python -m workers.doc_worker) uthayega,
+        # API restart par job lost nahi hota
+        job_id = await enqueue_job(INGEST_DOCUMENT, {
+            "file_path": temp_path,
+            "pdf_id": pdf_id,
+            "title": title,
+            "owner_email": current_admin # ["email"] hata diya kyunki current_admin hi email hai
+        })
 
         return {
-            "message": "Upload successful, processing started.", 
+            "message": "Upload successful, processing queued.", 
             "pdf_id": pdf_id, 
+            "job_id": job_id,
             "status": "processing"
         }
 
     except Exception as e:
         if os.path.exists(temp_path): os.remove(temp_path)
+        await get_documents_collection().delete_one({"pdf_id": pdf_id})
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
 
+# Scoped search: ek document / owner / act ke andar hi (indexed payload filters, filtered HNSW)
+@router.post("/search")
+async def search_library(
+    request: LibrarySearchRequest,
+    current_user: dict = Depends(get_current_active_user)
+):
+    filters = request.filters.model_dump(exclude_none=True) if request.filters else None
+    points = await search_points(request.query, build_filter(filters), limit=request.limit)
+    return {
+        "query": request.query,
+        "results": [
+            {
+                "pdf_id": p.payload.get("pdf_id"),
+                "document_name": p.payload.get("document_name"),
+                "page_num": p.payload.get("page_num"),
+                "page_start": p.payload.get("page_start"),
+                "page_end": p.payload.get("page_end"),
+                "section": p.payload.get("section"),
+                "score": p.score,
+                "text": p.payload.get("text", ""),
+            }
+            for p in points
+        ],
+    }
+
+
+
 # @router.get("/", response_model=List[DocumentOut])
 # async def list_my_documents(current_user: str = Depends(get_current_user_email)):
 #     cursor = get_documents_collection().find({"owner": current_user})
@@ -1,12 +1,15 @@
+import asyncio
 import os
+import time
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status,  UploadFile, File, Form
 from typing import List, Optional
 import logging
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import FileResponse
-from core.security import get_current_user, get_current_user_email, get_password_hash
-from core.database import get_database, get_embedding_vector, get_plans_collection, get_settings_collection, get_subscriptions_collection, get_token_usage_collection, get_users_collection, get_documents_collection, get_knowledge_base_collection
+from core.config import settings
+from core.security import get_current_user, get_current_user_email, get_password_hash, invalidate_user, password_hasher
+from core.database import redis_breaker, get_database, get_embedding_vector, get_plans_collection, get_settings_collection, get_subscriptions_collection, get_token_usage_collection, get_token_usage_daily_collection, get_users_collection, get_documents_collection, get_knowledge_base_collection
 from models.domain import ContentLibraryResponse, ContentLibraryStats, DeleteResponse, DocumentOut, DocumentStatus, PlanCreate, PlanResponse, SubscriptionResponse, SubscriptionTier, SystemSettings, UserAdminUpdate, UserBase, UserSettingsResponse, UserStatus
 from fastapi import UploadFile, File
 from bson import ObjectId
@@ -15,21 +18,26 @@ from services.ingestion.pdf_engine import PDFManager
 import io
 from bson.errors import InvalidId
 from services.ingestion.pdf_engine import PDFManager
+from services.agent.brain import semantic_cache
+from services.agent.semantic_cache import invalidate_semantic_cache
+from services.agent.tools import query_embedding_cache
+from services.agent.reranker import reranker
+from services.background.usage_writer import usage_writer
+from services.background.usage_rollups import rebuild_usage_rollups
+from services.background.queue_mgr import queue_stats
 from dotenv import load_dotenv
 load_dotenv()
 router = APIRouter()
 
-async def admin_required(current_user: str = Depends(get_current_user_email)):
+async def admin_required(user: dict = Depends(get_current_user)):
     """Dependency to check if the current user has administrative privileges."""
-    users_coll = get_users_collection()
-    user = await users_coll.find_one({"email": current_user})
-    
-    if not user or not user.get("is_admin", False):
+    # get_current_user ka cached principal reuse hota hai, alag find_one nahi
+    if not user.get("is_admin", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have administrative privileges to access this resource."
         )
-    return current_user
+    return user["email"]
 def pydantic_dict(doc):
     """Converts MongoDB _id to string id for Pydantic models."""
     if doc:
@@ -41,66 +49,106 @@ def pydantic_dict(doc):
 # --------------------------------------------------------------------------------------------------------------------
 
 
-@router.get("/admin/overview", dependencies=[Depends(admin_required)])
-async def get_admin_overview(current_admin: str = Depends(admin_required)):
-    """Retrieves high-level statistics for the admin dashboard overview."""
-    
+async def _compute_admin_overview() -> dict:
+    """One $facet pass over users, run concurrently with the documents count."""
     users_coll = get_users_collection()
     docs_coll = get_documents_collection()
-    # Assuming you have a collection tracking token usage per user
-    knowledge_coll = get_knowledge_base_collection() 
-    print("Fetching admin overview stats...")
-    # 1. Basic Counts
-    total_users = await users_coll.count_documents({})
-    total_docs = await docs_coll.count_documents({})
-    print(f"Total users: {total_users}, Total documents: {total_docs}")
-    # 2. Subscription Stats (if applicable)
-    active_subs = await users_coll.count_documents({"subscription_status": "active"})
-
-
-
-    # 3. revenue pipeline: We filter for active users and sum their plan prices
-    revenue_pipeline = [
-        {"$match": {"subscription_status": "active"}},
-        {"$group": {
-            "_id": None, 
-            "total_rev": {"$sum": "$plan_price"}
+    seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
+
+    users_pipeline = [
+        {"$facet": {
+            # 1. Basic Counts
+            "total_users": [{"$count": "n"}],
+            # 2. Subscription Stats
+            "active_subs": [
+                {"$match": {"subscription_status": "active"}},
+                {"$count": "n"}
+            ],
+            # 3. Revenue: active users ke plan prices ka sum
+            "revenue": [
+                {"$match": {"subscription_status": "active"}},
+                {"$group": {"_id": None, "total_rev": {"$sum": "$plan_price"}}}
+            ],
+            # 4. Aggregate Usage (Summing up total tokens used across system)
+            "tokens": [{"$group": {"_id": None, "total": {"$sum": "$tokens_used"}}}],
+            # 5. Growth Data (user sign ups by date for a chart)
+            "growth": [
+                {"$match": {"created_at": {"$gte": seven_days_ago}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
         }}
     ]
-    revenue_cursor = users_coll.aggregate(revenue_pipeline)
-    revenue_result = await revenue_cursor.to_list(1)
-    total_revenue = revenue_result[0]["total_rev"] if revenue_result else 0
-
-    # 3. Aggregate Usage (Summing up total tokens used across system)
-    pipeline = [{"$group": {"_id": None, "total": {"$sum": "$tokens_used"}}}]
-    usage_cursor = users_coll.aggregate(pipeline) # Or your specific usage collection
-    usage_result = await usage_cursor.to_list(1)
-    total_tokens = usage_result[0]["total"] if usage_result else 0
-
-    # 4. Monthly Growth Data (Aggregate user sign ups by date for a chart)
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    growth_pipeline = [
-        {"$match": {"created_at": {"$gte": seven_days_ago}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    growth_cursor = users_coll.aggregate(growth_pipeline)
-    growth_raw = await growth_cursor.to_list(100)
-    growth_data = [{"date": d["_id"], "count": d["count"]} for d in growth_raw]
+    users_facets, total_docs = await asyncio.gather(
+        users_coll.aggregate(users_pipeline).to_list(1),
+        docs_coll.count_documents({})
+    )
+    f = users_facets[0]
+
+    def first(key, field):
+        return f[key][0][field] if f[key] else 0
 
     return {
-        "total_users": total_users,
+        "total_users": first("total_users", "n"),
         "total_documents": total_docs,
-        "active_subscriptions": active_subs,
-        "total_tokens_used": total_tokens,
-        "growth_data": growth_data, 
-        "total_revenue": round(total_revenue, 2)
+        "active_subscriptions": first("active_subs", "n"),
+        "total_tokens_used": first("tokens", "total"),
+        "growth_data": [{"date": d["_id"], "count": d["count"]} for d in f["growth"]],
+        "total_revenue": round(first("revenue", "total_rev"), 2),
+        "generated_at": datetime.now(timezone.utc).isoformat()
     }
 
 
+# Dashboard polls ke liye per-worker snapshot (stale-while-revalidate)
+_overview_snapshot = {"data": None, "at": 0.0}
+_overview_lock = asyncio.Lock()
+_overview_refresh: Optional[asyncio.Task] = None
+
+
+async def _refresh_admin_overview() -> dict:
+    """Single-flight: lock ke peeche wait karne wale requests fresh snapshot hi reuse karte hain."""
+    async with _overview_lock:
+        if (_overview_snapshot["data"] is not None
+                and time.monotonic() - _overview_snapshot["at"] < settings.ADMIN_OVERVIEW_TTL_SECONDS):
+            return _overview_snapshot["data"]
+        data = await _compute_admin_overview()
+        _overview_snapshot.update(data=data, at=time.monotonic())
+        return data
+
+
+async def _background_refresh_overview():
+    try:
+        await _refresh_admin_overview()
+    except Exception as e:
+        logger.warning(f"⚠️ Admin overview refresh failed: {e}")
+
+
+async def get_admin_overview_snapshot() -> dict:
+    global _overview_refresh
+    data = _overview_snapshot["data"]
+    age = time.monotonic() - _overview_snapshot["at"]
+
+    if data is not None and age < settings.ADMIN_OVERVIEW_TTL_SECONDS:
+        return data
+    if data is not None and age < settings.ADMIN_OVERVIEW_MAX_STALE_SECONDS:
+        # Stale copy turant, refresh background mein (ek waqt par ek hi)
+        if _overview_refresh is None or _overview_refresh.done():
+            _overview_refresh = asyncio.create_task(_background_refresh_overview())
+        return data
+
+    # Cold start / bahut purana snapshot: ek hi request recompute karti hai, baaki uska result lete hain
+    return await _refresh_admin_overview()
+
+
+@router.get("/admin/overview")
+async def get_admin_overview(current_admin: str = Depends(admin_required)):
+    """Retrieves high-level statistics for the admin dashboard overview."""
+    return await get_admin_overview_snapshot()
+
+
 
 
 @router.get("/admin/overview/subscriptions")
@@ -134,10 +182,31 @@ async def get_recent_activity(current_admin: str = Depends(admin_required)):
     return [pydantic_dict(doc) for doc in recent_docs]
 
 
+# Cache hit/miss counters, taaki dikhe kitni embedding latency bach rahi hai
+@router.get("/admin/performance/cache-stats")
+async def get_cache_stats(current_admin: str = Depends(admin_required)):
+    """Returns hit/miss counters for the in-process caches of this worker."""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "semantic_answers": semantic_cache.stats(),
+        "redis_breaker": redis_breaker.stats(),
+        "token_usage_writer": usage_writer.stats(),
+        "password_hashing": password_hasher.stats(),
+        "reranker": reranker.stats(),
+    }
 
 
 
 
+
+
+# Ingestion queue depth / lag, workers scale karne ka signal
+@router.get("/admin/performance/ingestion-queue")
+async def get_ingestion_queue_stats(current_admin: str = Depends(admin_required)):
+    """Returns job counts per status and the age of the oldest queued job."""
+    return await queue_stats()
+
+
 # --------------------------------------------------------------------------------------------------------------------
 # user management endpoints -----------------------------------------------------------------------------------------
 # ----------------------------------------------------------------------------------------------------------------------
@@ -284,6 +353,7 @@ async def update_user_account_status(
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user(user_id=user_id)
         
     return {"message": f"User status updated to {new_status.value}"}
 
@@ -313,6 +383,7 @@ async def toggle_admin_privileges(
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user(user_id=user_id)
         
     status_text = "promoted to admin" if is_admin else "demoted to user"
     return {"message": f"User successfully {status_text}"}
@@ -381,6 +452,7 @@ async def update_user_admin(user_id: str, update_data: UserAdminUpdate, admin: d
     if result.matched_count == 0:
         # Ab ye error tabhi aayega jab sach mein wo ID DB mein na ho
         raise HTTPException(status_code=404, detail="user update failed - ID not found")
+    invalidate_user(user_id=user_id)
         
     return {"status": "success", "message": "User details updated successfully"}
 
@@ -403,6 +475,7 @@ async def delete_user_admin(user_id: str, admin: dict = Depends(admin_required))
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User deletion failed - User not found")
+    invalidate_user(user_id=user_id)
         
     return {"status": "success", "message": "User permanently deleted"}
 
@@ -656,58 +729,66 @@ async def get_token_usage_analytics(
     current_admin: str = Depends(admin_required)
 ):
     """Fetches high-level token analytics and graph data based on timeframe."""
-    usage_coll = get_token_usage_collection()
-    start_date = get_timeframe_start(days)
+    # Raw token_usage ki jagah daily rollups (day x plan x user) padhte hain
+    daily_coll = get_token_usage_daily_collection()
+    start_day = get_timeframe_start(days).strftime("%Y-%m-%d")
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    # 1. Aggregate Total Tokens for the period
-    usage_pipeline = [
-        {"$match": {"timestamp": {"$gte": start_date}}},
-        {"$group": {
-            "_id": None,
-            "total_tokens": {"$sum": "$tokens_used"},
-            "avg_tokens": {"$avg": "$tokens_used"}
+    pipeline = [
+        {"$match": {"day": {"$gte": start_day}}},
+        {"$facet": {
+            # 1. Total Tokens for the period
+            "totals": [{"$group": {
+                "_id": None,
+                "total_tokens": {"$sum": "$tokens_used"},
+                "requests": {"$sum": "$requests"}
+            }}],
+            # 2. Daily Usage Graph Data
+            "daily": [
+                {"$group": {"_id": "$day", "count": {"$sum": "$tokens_used"}}},
+                {"$sort": {"_id": 1}}
+            ],
+            # 3. Usage by Plan
+            "plans": [{"$group": {"_id": "$plan_type", "value": {"$sum": "$tokens_used"}}}],
+            # 4. Active users today
+            "active_today": [
+                {"$match": {"day": today}},
+                {"$group": {"_id": "$user_email"}},
+                {"$count": "n"}
+            ]
         }}
     ]
-    usage_stats = await usage_coll.aggregate(usage_pipeline).to_list(1)
-    
-    total = usage_stats[0]["total_tokens"] if usage_stats else 0
-    avg = usage_stats[0]["avg_tokens"] if usage_stats else 0
+    facets = (await daily_coll.aggregate(pipeline).to_list(1))[0]
 
-    # 2. Daily Usage Graph Data
-    graph_pipeline = [
-        {"$match": {"timestamp": {"$gte": start_date}}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
-            "count": {"$sum": "$tokens_used"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    graph_raw = await usage_coll.aggregate(graph_pipeline).to_list(days)
-    
-    # 3. Usage by Plan
-    plan_pipeline = [
-        {"$match": {"timestamp": {"$gte": start_date}}},
-        {"$group": {
-            "_id": "$plan_type",
-            "value": {"$sum": "$tokens_used"}
-        }}
-    ]
-    plan_usage = await usage_coll.aggregate(plan_pipeline).to_list(5)
+    totals = facets["totals"][0] if facets["totals"] else {"total_tokens": 0, "requests": 0}
+    total = totals["total_tokens"]
+    # Per-request average, same as the old $avg over raw records
+    avg = total / totals["requests"] if totals["requests"] else 0
+    active_today = facets["active_today"][0]["n"] if facets["active_today"] else 0
 
-    # FIXED: Wrap await in parentheses before calling len()
-    active_users_list = await usage_coll.distinct("user_email", {"timestamp": {"$gte": get_timeframe_start(1)}})
-    
     return {
         "header": {
             "total_tokens": total,
             "avg_daily": round(avg, 2),
-            "active_users_today": len(active_users_list) # Use the resolved list
+            "active_users_today": active_today
         },
-        "daily_usage": [{"date": d["_id"], "tokens": d["count"]} for d in graph_raw],
-        "usage_by_plan": [{"plan": p["_id"] or "Unknown", "tokens": p["value"]} for p in plan_usage]
+        "daily_usage": [{"date": d["_id"], "tokens": d["count"]} for d in facets["daily"]],
+        "usage_by_plan": [{"plan": p["_id"] or "Unknown", "tokens": p["value"]} for p in facets["plans"]]
     }
 
 
+# Historical data / seeded records / failed incremental updates ke baad rollups dobara banane ke liye
+@router.post("/token-usage/rollups/rebuild")
+async def rebuild_token_usage_rollups(
+    days: Optional[int] = None,
+    current_admin: str = Depends(admin_required)
+):
+    """Recomputes token_usage_daily from raw token_usage (all history, or the last `days`)."""
+    await usage_writer.flush()
+    count = await rebuild_usage_rollups(days)
+    return {"message": "Token usage rollups rebuilt", "rollup_docs": count}
+
+
 # it will allow you to wipe your test data easily once you are ready to transition from development to real usage.
 @router.delete("/test/clear-token-logs")
 async def clear_token_logs(current_admin: str = Depends(admin_required)):
@@ -731,21 +812,22 @@ async def get_top_token_users(
     current_admin: str = Depends(admin_required)
 ):
     """Ranks users by their token consumption for the selected period."""
-    usage_coll = get_token_usage_collection()
-    start_date = get_timeframe_start(days)
+    daily_coll = get_token_usage_daily_collection()
+    start_day = get_timeframe_start(days).strftime("%Y-%m-%d")
 
     pipeline = [
-        {"$match": {"timestamp": {"$gte": start_date}}},
+        {"$match": {"day": {"$gte": start_day}}},
+        {"$sort": {"day": -1}},
         {"$group": {
             "_id": "$user_email",
             "tokens_used": {"$sum": "$tokens_used"},
-            "plan": {"$first": "$plan_type"} # Get the plan associated with the user
+            "plan": {"$first": "$plan_type"} # Latest plan the user was billed under
         }},
         {"$sort": {"tokens_used": -1}},
         {"$limit": limit}
     ]
     
-    results = await usage_coll.aggregate(pipeline).to_list(limit)
+    results = await daily_coll.aggregate(pipeline).to_list(limit)
     
     # Formatting for UI Table with Rank
     return [
@@ -918,6 +1000,7 @@ async def delete_pdf_document(pdf_id: str, current_admin: str = Depends(admin_re
         
         # 4. Aakhir mein 'documents' record ko delete karo
         await docs_coll.delete_one({"pdf_id": pdf_id})
+        await invalidate_semantic_cache()
 
         return {
             "status": "success", 
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+# Project root ko path mein add karna
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_client.http import models
+
+from core.config import settings
+from core.database import close_qdrant_clients, get_async_qdrant_client
+
+# Usage:
+#   python benchmark_search.py --collections legal_knowledge legal_knowledge_scalar_202610171200 \
+#       --baseline legal_knowledge --ef 64 128 256 --oversampling 1.0 2.0 3.0
+#
+# Har collection + search param combination ke liye recall@k (exact search ke against)
+# aur p50/p95 latency. Queries: baseline collection ke sampled dense vectors, ya
+# --queries file (ek query per line) jo Gemini se embed hoti hain.
+
+
+def dense(vector):
+    """Named-vector point ({"" : dense, "bm25": sparse}) ya purana plain list, dono se dense vector."""
+    return vector.get("") if isinstance(vector, dict) else vector
+
+
+async def sample_query_vectors(collection: str, samples: int):
+    client = get_async_qdrant_client()
+    points, _ = await client.scroll(
+        collection_name=collection,
+        limit=samples * 5,
+        with_payload=False,
+        with_vectors=[""] if await has_named_dense(collection) else True,
+    )
+    vectors = [dense(p.vector) for p in points if dense(p.vector)]
+    random.shuffle(vectors)
+    return vectors[:samples]
+
+
+async def has_named_dense(collection: str) -> bool:
+    info = await get_async_qdrant_client().get_collection(collection)
+    return isinstance(info.config.params.vectors, dict)
+
+
+async def embed_query_file(path: str, samples: int):
+    from services.agent.tools import query_embedding_cache
+
+    with open(path) as f:
+        queries = [line.strip() for line in f if line.strip()][:samples]
+    return [await query_embedding_cache.embed_query(q) for q in queries]
+
+
+async def search_ids(collection: str, vector, k: int, params: models.SearchParams):
+    started = time.perf_counter()
+    response = await get_async_qdrant_client().query_points(
+        collection_name=collection,
+        query=vector,
+        search_params=params,
+        limit=k,
+        with_payload=False,
+    )
+    return [p.id for p in response.points], (time.perf_counter() - started) * 1000
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def describe(collection: str) -> str:
+    info = await get_async_qdrant_client().get_collection(collection)
+    params = info.config.params
+    vectors = params.vectors.get("") if isinstance(params.vectors, dict) else params.vectors
+    quant = info.config.quantization_config
+    quant_name = type(quant).__name__.replace("QuantizationConfig", "").lower() if quant else "none"
+    return (f"{collection}: points={info.points_count}, quantization={quant_name}, "
+            f"on_disk={getattr(vectors, 'on_disk', None)}, hnsw_m={info.config.hnsw_config.m}, "
+            f"ef_construct={info.config.hnsw_config.ef_construct}")
+
+
+async def run(args):
+    baseline = args.baseline or args.collections[0]
+    if args.queries:
+        vectors = await embed_query_file(args.queries, args.samples)
+    else:
+        vectors = await sample_query_vectors(baseline, args.samples)
+    if not vectors:
+        print(f"❌ No query vectors (is '{baseline}' empty?)")
+        return
+
+    print(f"📐 Ground truth: exact top-{args.k} on '{baseline}' for {len(vectors)} queries")
+    exact = models.SearchParams(exact=True)
+    truth = [set((await search_ids(baseline, v, args.k, exact))[0]) for v in vectors]
+
+    for collection in args.collections:
+        print(f"\n📦 {await describe(collection)}")
+        print(f"{'hnsw_ef':>8} {'oversamp':>8} {'rescore':>8} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for ef in args.ef:
+            for oversampling in args.oversampling:
+                for rescore in args.rescore:
+                    params = models.SearchParams(
+                        hnsw_ef=ef,
+                        quantization=models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling),
+                    )
+                    # Ek warmup pass taaki cold cache / mmap page-in latency na bigade
+                    await search_ids(collection, vectors[0], args.k, params)
+                    recalls, latencies = [], []
+                    for vector, expected in zip(vectors, truth):
+                        ids, ms = await search_ids(collection, vector, args.k, params)
+                        recalls.append(len(expected.intersection(ids)) / max(len(expected), 1))
+                        latencies.append(ms)
+                    print(f"{ef:>8} {oversampling:>8.1f} {str(rescore):>8} {statistics.mean(recalls):>10.3f} "
+                          f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f}")
+
+
+async def main(args):
+    try:
+        await run(args)
+    finally:
+        await close_qdrant_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k / latency benchmark for Qdrant collection profiles.")
+    parser.add_argument("--collections", nargs="+", default=[settings.QDRANT_COLLECTION])
+    parser.add_argument("--baseline", default=None,
+                        help="Collection used for exact ground truth (default: first of --collections)")
+    parser.add_argument("--queries", default=None, help="Text file, one query per line (embedded via Gemini)")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_PREFETCH_K)
+    parser.add_argument("--ef", type=int, nargs="+", default=[64, settings.QDRANT_SEARCH_HNSW_EF, 256])
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[1.0, settings.QDRANT_QUANTIZATION_OVERSAMPLING])
+    parser.add_argument("--rescore", type=lambda v: v.lower() in ("1", "true", "yes"), nargs="+", default=[True],
+                        help="e.g. --rescore true false")
+    asyncio.run(main(parser.parse_args()))
@@ -2,6 +2,7 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from pymongo import MongoClient
 import logging
 import os
+from typing import Optional
 # Initialize logger for the config module
 from dotenv import load_dotenv
 load_dotenv()
@@ -15,6 +16,130 @@ class Settings(BaseSettings):
     # AI & Service Keys (Can be in .env OR MongoDB)
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY") # Default to empty, loaded from DB
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_SOCKET_TIMEOUT: float = 0.25
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Itne lagataar failures ke baad Redis calls itne seconds tak skip hoti hain
+    REDIS_BREAKER_FAILURES: int = 3
+    REDIS_BREAKER_RESET_SECONDS: float = 30.0
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+
+    # LangGraph checkpointer ("mongodb" ya local dev ke liye "memory")
+    CHECKPOINTER_BACKEND: str = "mongodb"
+    CHECKPOINT_COLLECTION: str = "checkpoints"
+    CHECKPOINT_WRITES_COLLECTION: str = "checkpoint_writes"
+    CHECKPOINT_TTL_SECONDS: int = 30 * 24 * 3600
+    CHECKPOINT_KEEP_LAST: int = 10
+
+    # Context budget per LLM call (approx tokens)
+    CONTEXT_TOKEN_BUDGET: int = 12000
+    CONTEXT_SUMMARY_TRIGGER: int = 8000
+    CONTEXT_KEEP_TURNS: int = 3
+    CONTEXT_OLD_TOOL_OUTPUT_CHARS: int = 600
+
+    # Token usage accounting (buffered writes to token_usage)
+    USAGE_BUFFER_MAX: int = 50000
+    USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    USAGE_FLUSH_BATCH: int = 500
+
+    # Hybrid retrieval: dense (Gemini) + sparse BM25 named vector, RRF fusion in Qdrant
+    HYBRID_SEARCH_ENABLED: bool = True
+    SPARSE_VECTOR_NAME: str = "bm25"
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    BM25_AVG_DOC_TOKENS: float = 250.0
+    RETRIEVAL_TOP_K: int = 6
+    RETRIEVAL_PREFETCH_K: int = 30
+
+    # Optional local cross-encoder rerank (ONNX on CPU): RERANK_CANDIDATES fetch,
+    # best RERANK_TOP_N agent ko, har chunk RERANK_PASSAGE_CHARS tak trimmed.
+    # RERANK_MODEL_DIR set ho toh wahi se load, warna HF hub se ek baar download
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "Xenova/ms-marco-MiniLM-L-6-v2"
+    RERANK_ONNX_FILE: str = "onnx/model_quantized.onnx"
+    RERANK_MODEL_DIR: Optional[str] = None
+    RERANK_MAX_LENGTH: int = 384
+    RERANK_THREADS: int = 2
+    RERANK_CANDIDATES: int = 50
+    RERANK_TOP_N: int = 5
+    RERANK_PASSAGE_CHARS: int = 900
+
+    # Structure-aware chunking (services/ingestion/chunker.py), ~4 chars/token
+    CHUNK_MAX_TOKENS: int = 400
+    CHUNK_OVERLAP_TOKENS: int = 60
+    CHUNK_MIN_TOKENS: int = 40
+
+    # Durable ingestion queue (Mongo "jobs" collection) + doc worker
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 30
+    JOB_RETRY_BACKOFF_MAX_SECONDS: int = 900
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # Documents in flight per worker process (job slots)
+    DOC_WORKER_CONCURRENCY: int = 4
+    # Pipeline stages (workers/pipeline.py): har stage ke parallel workers + inter-stage queue size
+    PIPELINE_EXTRACT_CONCURRENCY: int = 2
+    PIPELINE_CHUNK_CONCURRENCY: int = 1
+    PIPELINE_EMBED_CONCURRENCY: int = 2
+    PIPELINE_UPSERT_CONCURRENCY: int = 2
+    PIPELINE_QUEUE_SIZE: int = 2
+
+    # Password hashing: bcrypt cost factor (purane hashes login par rehash hote hain),
+    # dedicated threads + max queued jobs before login/signup returns 503
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+
+    # Authenticated user principal cache (per worker). Status/permission changes
+    # isi worker mein turant invalidate hote hain, baaki workers mein TTL tak
+    USER_CACHE_SIZE: int = 4096
+    USER_CACHE_TTL_SECONDS: int = 30
+
+    # Admin overview snapshot: TTL ke baad stale copy serve + background refresh,
+    # MAX_STALE ke baad request khud recompute karti hai
+    ADMIN_OVERVIEW_TTL_SECONDS: int = 30
+    ADMIN_OVERVIEW_MAX_STALE_SECONDS: int = 300
+
+    # Query-embedding cache (retrieval tool)
+    QUERY_CACHE_SIZE: int = 2048
+    QUERY_CACHE_TTL_SECONDS: int = 3600
+    QUERY_CACHE_REDIS_ENABLED: bool = False
+    QUERY_CACHE_REDIS_TTL_SECONDS: int = 86400
+
+    # Semantic answer cache (Qdrant collection of past query vectors)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_COLLECTION: str = "semantic_cache"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.93
+    SEMANTIC_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Qdrant (vector DB)
+    QDRANT_HOST: str = "127.0.0.1"
+    QDRANT_PORT: int = 6333
+    QDRANT_COLLECTION: str = "legal_knowledge"
+    QDRANT_UPSERT_BATCH_SIZE: int = 256
+    QDRANT_UPSERT_CONCURRENCY: int = 4
+    # Collection storage profile (naye collections par lagta hai; purani ke liye
+    # migrate_collection.py). QUANTIZATION: "none" | "scalar" (int8) | "binary"
+    QDRANT_QUANTIZATION: str = "none"
+    QDRANT_SCALAR_QUANTILE: float = 0.99
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_VECTORS_ON_DISK: bool = False
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_HNSW_ON_DISK: bool = False
+    # Search-time: HNSW ef, quantized candidates ko original vectors se rescore + oversampling
+    QDRANT_SEARCH_HNSW_EF: int = 128
+    QDRANT_QUANTIZATION_RESCORE: bool = True
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+
+    # Embedding pipeline (ingestion)
+    EMBED_BATCH_SIZE: int = 64
+    EMBED_CONCURRENCY: int = 4
+    EMBED_MAX_RETRIES: int = 5
+    EMBED_BACKOFF_BASE: float = 1.0
+    EMBED_BACKOFF_MAX: float = 30.0
+    # Content-addressed embedding cache (Mongo); entries unused for this long are evicted
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_TTL_DAYS: int = 90
     
     # Security 
     SECRET_KEY: str
@@ -1,11 +1,16 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from core.cache import CircuitBreaker
 from core.config import settings
 from pymongo.server_api import ServerApi
 import redis.asyncio as redis
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from dotenv import load_dotenv
 load_dotenv()
 client = None
 database = None
+redis_client = None
+qdrant_client = None
+async_qdrant_client = None
 
 async def connect_to_mongo():
     global client, database
@@ -23,6 +28,94 @@ async def close_mongo_connection():
     if client:
         client.close()
 
+def get_qdrant_client() -> QdrantClient:
+    """Process-wide sync Qdrant client (scripts aur bootstrap ke liye)."""
+    global qdrant_client
+    if qdrant_client is None:
+        qdrant_client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT, check_compatibility=False)
+    return qdrant_client
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Process-wide async Qdrant client; sab coroutines ek hi connection pool share karte hain."""
+    global async_qdrant_client
+    if async_qdrant_client is None:
+        async_qdrant_client = AsyncQdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT, check_compatibility=False)
+    return async_qdrant_client
+
+async def close_qdrant_clients():
+    global qdrant_client, async_qdrant_client
+    if async_qdrant_client is not None:
+        await async_qdrant_client.close()
+        async_qdrant_client = None
+    if qdrant_client is not None:
+        qdrant_client.close()
+        qdrant_client = None
+
+def get_redis_client() -> redis.Redis:
+    """
+    Shared async Redis client (connection pool) with short socket timeouts,
+    so a slow or missing Redis costs milliseconds, not a full TCP timeout.
+    """
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+    return redis_client
+
+redis_breaker = CircuitBreaker(
+    failure_threshold=settings.REDIS_BREAKER_FAILURES,
+    reset_timeout=settings.REDIS_BREAKER_RESET_SECONDS,
+)
+
+async def cache_get(key: str):
+    """Redis GET jo outage mein turant None (cache miss) deta hai, hang nahi hota."""
+    if not redis_breaker.allow():
+        return None
+    try:
+        value = await get_redis_client().get(key)
+        redis_breaker.record_success()
+        return value
+    except Exception as e:
+        redis_breaker.record_failure()
+        print(f"⚠️ Redis GET failed ({redis_breaker.state}): {e}")
+        return None
+
+async def cache_setex(key: str, ttl: int, value: str) -> bool:
+    if not redis_breaker.allow():
+        return False
+    try:
+        await get_redis_client().setex(key, ttl, value)
+        redis_breaker.record_success()
+        return True
+    except Exception as e:
+        redis_breaker.record_failure()
+        print(f"⚠️ Redis SETEX failed ({redis_breaker.state}): {e}")
+        return False
+
+async def cache_incr(key: str):
+    """Redis INCR (e.g. version counters); outage mein None."""
+    if not redis_breaker.allow():
+        return None
+    try:
+        value = await get_redis_client().incr(key)
+        redis_breaker.record_success()
+        return value
+    except Exception as e:
+        redis_breaker.record_failure()
+        print(f"⚠️ Redis INCR failed ({redis_breaker.state}): {e}")
+        return None
+
+async def close_redis_client():
+    global redis_client
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+
 def get_database():
     if database is None:
         raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
@@ -136,6 +229,11 @@ def get_token_usage_collection():
         raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
     return database.token_usage
 
+def get_token_usage_daily_collection():
+    if database is None:
+        raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
+    return database.token_usage_daily
+
 def get_subscriptions_collection():
     if database is None:
         raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
@@ -156,6 +254,16 @@ def get_settings_collection():
         raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
     return database.settings
 
+def get_embedding_cache_collection():
+    if database is None:
+        raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
+    return database.embedding_cache
+
+def get_jobs_collection():
+    if database is None:
+        raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
+    return database.jobs
+
 def get_embedding_vector():
     if database is None:
         raise RuntimeError("Database not initialized. Ensure connect_to_mongo() has been called.")
@@ -1,12 +1,16 @@
+import asyncio
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone # Added timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from core.cache import TTLCache
 from core.config import settings
 from core.database import get_users_collection
-from models.domain import TokenData
 from dotenv import load_dotenv
 load_dotenv()
 import bcrypt
@@ -33,10 +37,101 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     # Password ko bytes mein convert karke hash karein
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed_password = bcrypt.hashpw(pwd_bytes, salt)
     return hashed_password.decode('utf-8')
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the stored hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    try:
+        # Format: $2b$<rounds>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so ~250 ms of hashing never blocks
+    the event loop (bcrypt releases the GIL). A semaphore caps concurrent
+    hashes at the pool size; callers beyond `max_queue` waiting are rejected
+    with 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_waiting_seen = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_ms += (started_at - queued_at) * 1000
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run_ms += (time.perf_counter() - started_at) * 1000
+            self._semaphore.release()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting_seen": self.max_waiting_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_ms / self.completed, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.total_run_ms / self.completed, 2) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Async verify_password for request handlers (runs on the hashing pool)."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def aget_password_hash(password: str) -> str:
+    """Async get_password_hash for request handlers (runs on the hashing pool)."""
+    return await password_hasher.hash(password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     
@@ -66,53 +161,51 @@ async def get_current_user_email(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+# Short-TTL principal cache: har authenticated request par users.find_one nahi
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+async def load_user(email: str) -> Optional[dict]:
+    """
+    Cached users lookup by email. Callers get a copy, so mutating the
+    returned doc never leaks into the cache.
+    """
+    user = user_cache.get(email)
+    if user is None:
+        user = await get_users_collection().find_one({"email": email})
+        if user is None:
+            return None
+        user_cache.set(email, user)
+    return copy.deepcopy(user)
+
+def invalidate_user(email: Optional[str] = None, user_id: Optional[str] = None):
+    """Drops a cached principal after its users record changes (by email and/or _id)."""
+    if email:
+        user_cache.pop(email)
+    if user_id:
+        for key, user in user_cache.items():
+            if str(user.get("_id")) == str(user_id):
+                user_cache.pop(key)
+
+async def get_current_user(email: str = Depends(get_current_user_email)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    
-    users_collection = get_users_collection()
-    user = await users_collection.find_one({"email": token_data.email})
+    # FastAPI ek request mein dependency result reuse karta hai (request-scoped),
+    # across requests user_cache kaam aata hai
+    user = await load_user(email)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+async def get_current_user_id(current_user: dict = Depends(get_current_user)) -> str:
     """
     Directly returns the user's ID as a string from the database.
     Useful for filtering collections where user_id is stored as a string.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    users_collection = get_users_collection()
-    user = await users_collection.find_one({"email": email})
-    
-    if user is None:
-        raise credentials_exception
-    
     # MongoDB ki ObjectId ko string mein convert karke return karo
-    return str(user["_id"])
+    return str(current_user["_id"])
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
     if not current_user.get("is_active", True):
@@ -7,8 +7,10 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from core.config import settings
-from core.database import connect_to_mongo, close_mongo_connection
-from qdrant_client import QdrantClient
+from core.database import connect_to_mongo, close_mongo_connection, close_qdrant_clients, close_redis_client, get_async_qdrant_client
+from services.background.usage_writer import usage_writer
+from services.background.processor import pdf_manager
+from services.agent.reranker import reranker
 from api.endpoints import iam, auth, assistant, library, management 
 from langchain_core.tracers.langchain import wait_for_all_tracers
 
@@ -24,25 +26,32 @@ logger = logging.getLogger("juristway")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    q_host =["localhost","127.0.0.1"]
-    q_port = 6333
     try:
         # DB Connection
         await connect_to_mongo()
         logger.info("✅ MongoDB Connected")
 
         # ✅ Vector Store Initialized (Qdrant)
-        # Ab hum direct client initialize kar rahe hain
-        app.state.qdrant = QdrantClient(host=q_host[1], port=q_port)
+        # Shared async client, wahi pool jo search tool use karta hai
+        app.state.qdrant = get_async_qdrant_client()
+        # Collection + sparse BM25 vector config (idempotent)
+        await pdf_manager.setup_qdrant()
         logger.info("✅ Qdrant Client Ready")
 
+        # Rerank model pehli query se pehle load (RERANK_ENABLED ho tabhi)
+        await reranker.warmup()
+
     except Exception as e:
         logger.critical(f"❌ Startup Failed: {e}")
         raise e
     
     yield
 
+    # Buffered token usage records flush karo, phir connections band
+    await usage_writer.stop()
     await close_mongo_connection()
+    await close_qdrant_clients()
+    await close_redis_client()
     # This forces the script to wait until all traces are uploaded
     wait_for_all_tracers()
     logger.info("✅ Database Connection Closed")
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Project root ko path mein add karna
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_client.http import models
+
+from core.config import settings
+from core.database import close_qdrant_clients, get_async_qdrant_client
+from services.ingestion.pdf_engine import PDFManager, collection_profile
+from services.ingestion.sparse import sparse_encoder
+
+# Usage:
+#   python migrate_collection.py --quantization scalar --on-disk --hnsw-m 16 --ef-construct 200
+#
+# Purani dense-only legal_knowledge (hybrid BM25 se pehle ki) ke liye yahi required step hai:
+# Qdrant existing collection mein naya sparse vector add nahi karne deta. Copy ke dauraan
+# jin points mein BM25 vector nahi hai unka sparse vector payload text se ban jata hai.
+#
+# Existing collection ke points (dense + sparse vectors + payload) ek naye collection mein
+# copy hote hain jo naye storage profile se bana hai, phir QDRANT_COLLECTION naam ka alias
+# atomically naye collection par switch hota hai. App alias ke through hi read/write karta hai.
+# Migration ke dauraan doc workers rok do, warna beech mein aaye naye points copy nahi honge.
+
+
+async def resolve(name: str):
+    """Returns (is_alias, physical_collection_name)."""
+    client = get_async_qdrant_client()
+    aliases = await client.get_aliases()
+    for alias in aliases.aliases:
+        if alias.alias_name == name:
+            return True, alias.collection_name
+    if await client.collection_exists(name):
+        return False, name
+    return False, None
+
+
+async def copy_points(source: str, target: str, batch_size: int) -> int:
+    client = get_async_qdrant_client()
+    total = (await client.count(source, exact=True)).count
+    copied, offset, encoded_sparse = 0, None, 0
+    started = time.perf_counter()
+
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not points:
+            break
+        batch = []
+        for p in points:
+            vector = dict(p.vector) if isinstance(p.vector, dict) else {"": p.vector}
+            if settings.SPARSE_VECTOR_NAME not in vector:
+                vector[settings.SPARSE_VECTOR_NAME] = sparse_encoder.encode_document((p.payload or {}).get("text", ""))
+                encoded_sparse += 1
+            batch.append(models.PointStruct(id=p.id, vector=vector, payload=p.payload))
+        await client.upsert(collection_name=target, points=batch, wait=True)
+        copied += len(batch)
+
+        elapsed = time.perf_counter() - started
+        rate = copied / elapsed if elapsed else 0
+        eta = (total - copied) / rate if rate else 0
+        print(f"  [{copied}/{total}] {rate:.0f} points/s, ETA {eta:.0f}s")
+        if offset is None:
+            break
+
+    if encoded_sparse:
+        print(f"🧮 Built '{settings.SPARSE_VECTOR_NAME}' vectors for {encoded_sparse} points from their payload text.")
+    return copied
+
+
+async def migrate(args):
+    client = get_async_qdrant_client()
+    base = settings.QDRANT_COLLECTION
+    is_alias, source = await resolve(base)
+    if source is None:
+        print(f"❌ Neither a collection nor an alias named '{base}' exists.")
+        return
+
+    profile = collection_profile(
+        quantization=args.quantization,
+        on_disk=args.on_disk,
+        hnsw_m=args.hnsw_m,
+        ef_construct=args.ef_construct,
+    )
+    target = args.target or f"{base}_{args.quantization or settings.QDRANT_QUANTIZATION}_{datetime.now(timezone.utc):%Y%m%d%H%M}"
+    if await client.collection_exists(target):
+        print(f"❌ Target collection '{target}' already exists.")
+        return
+
+    print(f"🚀 Migrating '{base}' ({'alias of ' + source if is_alias else 'collection'}) -> '{target}'")
+    await client.create_collection(collection_name=target, **profile)
+    await PDFManager()._ensure_payload_indexes(target)
+
+    copied = await copy_points(source, target, args.batch_size)
+    source_count = (await client.count(source, exact=True)).count
+    target_count = (await client.count(target, exact=True)).count
+    if target_count != source_count:
+        print(f"❌ Count mismatch (source {source_count}, target {target_count}); alias not switched. "
+              f"Inspect or delete '{target}' and retry.")
+        return
+    print(f"✅ Copied {copied} points, counts match ({target_count}).")
+
+    if is_alias:
+        # Ek hi request mein delete + create: readers ko kabhi missing alias nahi dikhta
+        await client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=base)),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=base)),
+        ])
+        print(f"🔀 Alias '{base}' now points to '{target}'.")
+        if args.drop_old:
+            await client.delete_collection(source)
+            print(f"🗑️ Dropped previous collection '{source}'.")
+    elif args.drop_old:
+        # Pehli migration: '{base}' asli collection hai, alias banane se pehle use hatana padta hai
+        await client.delete_collection(source)
+        await client.update_collection_aliases(change_aliases_operations=[
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=base)),
+        ])
+        print(f"🔀 Dropped collection '{base}' and created alias '{base}' -> '{target}'.")
+    else:
+        print(f"ℹ️ '{base}' is a concrete collection, so an alias can't take its name yet. "
+              f"Re-run with --drop-old to replace it, or point QDRANT_COLLECTION at '{target}'.")
+
+
+async def main(args):
+    try:
+        await migrate(args)
+    finally:
+        await close_qdrant_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the legal_knowledge collection under a new storage profile.")
+    parser.add_argument("--quantization", choices=["none", "scalar", "binary"], default=None,
+                        help="Defaults to QDRANT_QUANTIZATION")
+    parser.add_argument("--on-disk", dest="on_disk", action="store_true", default=None,
+                        help="Keep original float32 vectors on disk (mmap)")
+    parser.add_argument("--in-ram", dest="on_disk", action="store_false",
+                        help="Keep original vectors in RAM")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="Defaults to QDRANT_HNSW_M")
+    parser.add_argument("--ef-construct", type=int, default=None, help="Defaults to QDRANT_HNSW_EF_CONSTRUCT")
+    parser.add_argument("--batch-size", type=int, default=512, help="Points per scroll/upsert batch")
+    parser.add_argument("--target", default=None, help="Name of the new physical collection")
+    parser.add_argument("--drop-old", action="store_true",
+                        help="Delete the previous collection after the switch")
+    asyncio.run(main(parser.parse_args()))
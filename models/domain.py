@@ -8,9 +8,23 @@ load_dotenv()
 # Custom Type for MongoDB ObjectIDs
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
+class SearchFilters(BaseModel):
+    """Retrieval scope: restrict search to documents, an owner or a page range."""
+    pdf_ids: Optional[List[str]] = None
+    document_names: Optional[List[str]] = None   # e.g. a specific Act's PDF
+    owner: Optional[str] = None                  # uploader email (user_email payload)
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+
 class ChatRequest(BaseModel):
     message: str
     chat_id: Optional[str] = None   # Optional chat/thread ID
+    filters: Optional[SearchFilters] = None   # Scoped chat: sirf in documents se answer
+
+class LibrarySearchRequest(BaseModel):
+    query: str
+    filters: Optional[SearchFilters] = None
+    limit: Optional[int] = Field(default=None, ge=1, le=50)
 
 class ChatResponse(BaseModel):
     message: str | list[Any]
@@ -10,6 +10,7 @@ class AgentState(TypedDict):
     - messages: The full list of conversation history.
     - current_context: Any specific legal document text retrieved.
     - user_id: ID of the person asking, to ensure data privacy.
+    - summary: Rolling summary of older turns that were dropped from messages.
     """
     
     # The 'add_messages' function tells LangGraph to append new 
@@ -18,4 +19,5 @@ class AgentState(TypedDict):
     
     # You can add custom fields here to track specific legal metadata
     current_context: str
-    user_id: str
\ No newline at end of file
+    user_id: str
+    summary: str
\ No newline at end of file
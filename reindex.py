@@ -1,15 +1,127 @@
+import argparse
 import asyncio
+import hashlib
+import json
 import os
+import re
 import sys
+import time
+import uuid
+from datetime import datetime, timezone
 
 # Project root ko path mein add karna
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Aapke database functions aur config import karein
-from core.database import connect_to_mongo, close_mongo_connection
+from core.database import connect_to_mongo, close_mongo_connection, get_documents_collection
 from services.ingestion.pdf_engine import PDFManager
+from services.ingestion.chunker import CHUNKER_VERSION
+from services.ingestion.sparse import SPARSE_ENCODER_VERSION
+from services.background.usage_writer import usage_writer
 
-async def run_reindexing():
+MANIFEST_PATH = os.path.join(os.getcwd(), "storage", "reindex_manifest.json")
+DEFAULT_OWNER = "admin@juristway.com"
+# Library uploads "<pdf_id>_<name>.pdf" naam se save hote hain
+UPLOAD_NAME_RE = re.compile(r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_", re.I)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict):
+    # Atomic write, taaki beech mein crash hone par manifest corrupt na ho
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def pdf_id_for(filename: str, entry: dict) -> str:
+    if entry.get("pdf_id"):
+        return entry["pdf_id"]
+    match = UPLOAD_NAME_RE.match(filename)
+    return match.group(1) if match else str(uuid.uuid4())
+
+
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def report(self, filename: str, message: str):
+        self.done += 1
+        elapsed = time.perf_counter() - self.started
+        remaining = (elapsed / self.done) * (self.total - self.done)
+        print(
+            f"[{self.done}/{self.total}] {message} {filename} "
+            f"| elapsed {elapsed:.0f}s, ETA {remaining:.0f}s"
+        )
+
+
+async def index_file(manager: PDFManager, pdf_dir: str, filename: str, manifest: dict,
+                     full: bool, progress: Progress, lock: asyncio.Lock):
+    file_path = os.path.join(pdf_dir, filename)
+    loop = asyncio.get_running_loop()
+    file_hash = await loop.run_in_executor(None, file_sha256, file_path)
+    entry = manifest.get(filename, {})
+
+    # Chunker / sparse encoder badla ho toh unchanged file bhi dobara index hogi
+    if (not full and entry.get("sha256") == file_hash and entry.get("chunker") == CHUNKER_VERSION
+            and entry.get("sparse") == SPARSE_ENCODER_VERSION):
+        progress.report(filename, "⏭️  unchanged")
+        return
+
+    pdf_id = pdf_id_for(filename, entry)
+    try:
+        # Naya data pehle (same deterministic point IDs overwrite hote hain), purane stale
+        # chunks sirf successful ingest ke baad hatate hain
+        started = datetime.now(timezone.utc)
+        doc = await get_documents_collection().find_one({"pdf_id": pdf_id})
+        count = await manager.save_to_mongo_and_qdrant(
+            pdf_path=file_path,
+            document_name=doc.get("title", filename) if doc else filename,
+            user_email=doc.get("owner", DEFAULT_OWNER) if doc else DEFAULT_OWNER,
+            pdf_id=pdf_id
+        )
+        if doc:
+            await get_documents_collection().update_one(
+                {"pdf_id": pdf_id},
+                {"$set": {"status": "ready", "chunk_count": count, "processed_at": datetime.now(timezone.utc)}}
+            )
+        point_ids = await manager.point_ids_written_since(pdf_id, started)
+        removed = await manager.delete_stale_chunks(pdf_id, point_ids, written_since=started)
+
+        async with lock:
+            manifest[filename] = {
+                "sha256": file_hash,
+                "chunker": CHUNKER_VERSION,
+                "sparse": SPARSE_ENCODER_VERSION,
+                "pdf_id": pdf_id,
+                "point_ids": point_ids,
+                "chunks": count,
+                "indexed_at": datetime.now(timezone.utc).isoformat(),
+            }
+            save_manifest(manifest)
+        action = "♻️  replaced" if removed else "✅ indexed"
+        progress.report(filename, f"{action} ({count} chunks)")
+    except Exception as e:
+        progress.report(filename, f"❌ failed ({e})")
+
+
+async def run_reindexing(workers: int = 4, full: bool = False):
     # --- STEP 1: Database Connection Initialise karein ---
     print("🔗 Connecting to MongoDB...")
     try:
@@ -29,34 +141,44 @@ async def run_reindexing():
         return
 
     manager = PDFManager()
+    await manager.setup_qdrant()
+    manifest = load_manifest()
     
     # --- STEP 3: Files Indexing ---
-    files = [f for f in os.listdir(pdf_dir) if f.lower().endswith(".pdf")]
+    files = sorted(f for f in os.listdir(pdf_dir) if f.lower().endswith(".pdf"))
     
     if not files:
         print("⚠️ Storage folder is empty.")
         await close_mongo_connection()
         return
 
-    print(f"🚀 {len(files)} got files. processing start ")
-
-    for filename in files:
-        file_path = os.path.join(pdf_dir, filename)
-        print(f"📑 Processing: {filename}")
-        try:
-            # save_to_mongo_and_qdrant internally get_knowledge_base_collection use karega
-            count = await manager.save_to_mongo_and_qdrant(
-                pdf_path=file_path,
-                document_name=filename,
-                user_email="admin@juristway.com"
-            )
-            print(f"   ✅ Done! {count} chunks added.")
-        except Exception as e:
-            print(f"   ❌ Error indexing {filename}: {e}")
+    print(f"🚀 {len(files)} got files. processing start ({workers} workers{', full rebuild' if full else ''})")
+
+    progress = Progress(len(files))
+    lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async def worker(filename: str):
+        async with semaphore:
+            await index_file(manager, pdf_dir, filename, manifest, full, progress, lock)
+
+    await asyncio.gather(*(worker(f) for f in files))
+
+    # Jo files folder se hat gayi hain unke chunks bhi hatao
+    for filename in [f for f in manifest if f not in files]:
+        removed = await manager.delete_document_chunks(manifest[filename]["pdf_id"])
+        print(f"🗑️ {filename} removed from storage, deleted {removed} stale chunks.")
+        del manifest[filename]
+    save_manifest(manifest)
 
     # --- STEP 4: Safai ---
+    await usage_writer.stop()
     await close_mongo_connection()
     print("\n🏁 Indexing complete. Database connection closed.")
 
 if __name__ == "__main__":
-    asyncio.run(run_reindexing())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Incrementally reindex storage/pdfs into Qdrant + MongoDB.")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed concurrently")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild every file")
+    args = parser.parse_args()
+    asyncio.run(run_reindexing(workers=args.workers, full=args.full))
@@ -4,6 +4,7 @@ import random
 from datetime import datetime, timedelta, timezone
 # Import your actual database connection helper here
 from core.database import get_database, connect_to_mongo, get_token_usage_collection 
+from services.background.usage_rollups import rebuild_usage_rollups
 
 async def seed_token_data():
     print("Connecting to MongoDB...")
@@ -27,6 +28,9 @@ async def seed_token_data():
     
     await usage_coll.insert_many(seed_data)
     print("Done! Successfully seeded 50 logs.")
+    # Dashboard rollups padhta hai, raw logs nahi
+    await rebuild_usage_rollups(days=7)
+    print("Rollups rebuilt for the last 7 days.")
 
 if __name__ == "__main__":
     asyncio.run(seed_token_data())
\ No newline at end of file
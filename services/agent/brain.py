@@ -1,48 +1,40 @@
-import os
+import hashlib
+import json
 import re
 import logging
-from redis import Redis
 
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
 
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_core.messages import HumanMessage
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import AIMessage, HumanMessage
 
 from core.config import settings
+from core.database import cache_get, cache_setex
 from models.state import AgentState
-from services.agent.tools import legal_tools
+from services.agent.checkpointer import build_checkpointer, schedule_prune
+from services.agent.context import build_context
+from services.agent.usage import UsageCallbackHandler
+from services.background.usage_writer import set_usage_context
+from services.agent.semantic_cache import SemanticAnswerCache, corpus_version
+from services.agent.tools import legal_tools, query_embedding_cache, set_search_scope
 
 logger = logging.getLogger(__name__)
 from dotenv import load_dotenv
 load_dotenv()
 # --- 1. INFRASTRUCTURE SETUP ---
 
-# Memory Checkpointer (In-memory for development)
-memory = MemorySaver()
+# Persistent Checkpointer (MongoDB, TTL + per-thread pruning)
+memory = build_checkpointer()
 
-# Redis Client
-redis_client = Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=6379,
-    decode_responses=True
-)
-
-# Embeddings (Used if you want to upgrade to true Semantic Caching later)
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001",
-    google_api_key=settings.GEMINI_API_KEY,
-    output_dimensionality=3072,
-    task_type="retrieval_query"
-
-)
+# Semantic Cache: query vectors retrieval tool wale cache se aate hain (same 768-dim model)
+semantic_cache = SemanticAnswerCache(query_embedding_cache)
 
 # LLM with Tool Binding
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     google_api_key=settings.GEMINI_API_KEY,
-    streaming=False,
+    streaming=True, # astream_events ke through tokens UI tak stream hote hain
     temperature=0,
     max_output_tokens=2048, 
     max_retries=3,
@@ -50,6 +42,16 @@ llm = ChatGoogleGenerativeAI(
 
 ).bind_tools(legal_tools)
 
+# Purane turns ki rolling summary ke liye (no tools, chhota output)
+summarizer_llm = ChatGoogleGenerativeAI(
+    model="gemini-2.5-flash",
+    google_api_key=settings.GEMINI_API_KEY,
+    temperature=0,
+    max_output_tokens=512,
+    max_retries=2,
+    timeout=30
+).with_config(tags=["summarizer"])
+
 # --- 2. LANGGRAPH WORKFLOW ---
 
 async def call_model(state: AgentState):
@@ -57,9 +59,17 @@ async def call_model(state: AgentState):
         "role": "system",
         "content": "You are a senior legal expert. Use the search_legal_documents tool to find relevant laws. Always cite your sources in the format 'Source: filename.pdf'."
     }
-    messages = [system_prompt] + state["messages"]
+    # History window + rolling summary + token budget
+    context, removals, summary = await build_context(
+        state["messages"], state.get("summary", ""), summarizer_llm
+    )
+    messages = [system_prompt] + context
     response = await llm.ainvoke(messages)
-    return {"messages": [response]}
+
+    update = {"messages": removals + [response]}
+    if removals:
+        update["summary"] = summary
+    return update
 
 def should_continue(state: AgentState):
     last_message = state["messages"][-1]
@@ -77,41 +87,150 @@ agent_executor = workflow.compile(checkpointer=memory)
 
 # --- 3. ORCHESTRATION LOGIC ---
 
-async def run_juristway_ai(query: str, thread_id: str):
-    # 1. Redis Cache Check
-    cache_key = f"cache:v1:{query.strip().lower()}"
-    try:
-        cached_res = redis_client.get(cache_key)
-        if cached_res: return {"answer": cached_res, "source": "redis", "link": None}
-    except Exception: pass
+async def _answer_cache_key(query: str) -> str:
+    # Corpus version: document upload/delete/reindex ke baad purane answers miss hote hain
+    normalized = " ".join(query.lower().split())
+    return f"cache:v3:{await corpus_version()}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
 
-    # 2. LangGraph Execution
-    config = {"configurable": {"thread_id": thread_id}}
-    result = await agent_executor.ainvoke({"messages": [HumanMessage(content=query)]}, config)
-    
-    final_answer = result["messages"][-1].content
-
-    # 3. Source extraction (RegEx for UI links)
-    source_pdf = None
-    follow_up_link = None
-    
-    # Tool output check kar rahe hain
-    for msg in reversed(result["messages"]):
+async def _is_new_thread(config: dict) -> bool:
+    try:
+        snapshot = await agent_executor.aget_state(config)
+        return not snapshot.values.get("messages")
+    except Exception:
+        return False
+
+def _content_text(content) -> str:
+    """Gemini content kabhi string hota hai, kabhi content blocks ki list."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+def _extract_source(messages):
+    """Source extraction (RegEx for UI links) from the latest tool outputs."""
+    for msg in reversed(messages):
         if msg.type == "tool":
             match = re.search(r"Source:\s*([\w-]+\.pdf)", msg.content)
             if match:
                 source_pdf = match.group(1)
                 # Aapka S3 bucket ya local view link
-                follow_up_link = f"/api/view-pdf/{source_pdf}" 
-                break
+                return f"Document: {source_pdf}", f"/api/view-pdf/{source_pdf}"
+    return "llm", None
 
-    # 4. Cache update
+async def _record_cached_turn(query: str, answer, config: dict):
+    """Cache hit bhi thread ki history (checkpoint) mein jata hai, taaki agla turn use yaad rakhe."""
     try:
-        redis_client.setex(cache_key, 3600, final_answer)
-    except Exception: pass
+        await agent_executor.aupdate_state(
+            config,
+            {"messages": [HumanMessage(content=query), AIMessage(content=answer)]},
+            as_node="agent",
+        )
+        schedule_prune(config["configurable"]["thread_id"])
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record cached answer in thread history: {e}")
+
+async def _cached_answer(query: str, config: dict, answer_key: str):
+    """
+    Returns (cached_result, use_semantic_cache). Redis exact-match pehle,
+    phir semantic cache (sirf naye thread par; follow-ups history par depend karte hain).
+    """
+    # Async pool + circuit breaker; Redis down = fast miss
+    cached_res = await cache_get(answer_key)
+    if cached_res:
+        cached = {"answer": json.loads(cached_res), "source": "redis", "link": None}
+        await _record_cached_turn(query, cached["answer"], config)
+        return cached, False
+
+    use_semantic_cache = settings.SEMANTIC_CACHE_ENABLED and await _is_new_thread(config)
+    if use_semantic_cache:
+        cached = await semantic_cache.lookup(query)
+        if cached:
+            await _record_cached_turn(query, cached["answer"], config)
+            return {"answer": cached["answer"], "source": cached.get("source", "semantic-cache"), "link": cached.get("link")}, False
+    return None, use_semantic_cache
+
+async def _finalize(query: str, messages, use_semantic_cache: bool, answer_key: str = None):
+    final_answer = messages[-1].content
+    source, follow_up_link = _extract_source(messages)
+
+    # Cache update (scoped/filtered answers ka answer_key None hota hai, global cache mein nahi jaate)
+    if answer_key:
+        await cache_setex(answer_key, settings.ANSWER_CACHE_TTL_SECONDS, json.dumps(final_answer))
+    if use_semantic_cache:
+        await semantic_cache.store(query, final_answer, source, follow_up_link)
 
     return {
         "answer": final_answer, 
-        "source": "llm" if not source_pdf else f"Document: {source_pdf}", 
+        "source": source, 
         "link": follow_up_link
-    }
\ No newline at end of file
+    }
+
+def _run_config(thread_id: str, user_email: str, plan_type: str, filters: dict = None) -> dict:
+    # Tool ke andar embedding calls bhi isi user/plan par account hoti hain (contextvar)
+    set_usage_context(user_email, plan_type)
+    # Retrieval scope bhi contextvar se tool tak pahunchta hai
+    set_search_scope(filters)
+    return {
+        "configurable": {"thread_id": thread_id},
+        "callbacks": [UsageCallbackHandler(user_email, plan_type)],
+    }
+
+async def run_juristway_ai(query: str, thread_id: str, user_email: str = None, plan_type: str = None,
+                           filters: dict = None):
+    config = _run_config(thread_id, user_email, plan_type, filters)
+
+    # 1. Redis + Semantic Cache Check (scoped queries ka answer scope par depend karta hai, cache skip)
+    use_semantic_cache, answer_key = False, None
+    if not filters:
+        answer_key = await _answer_cache_key(query)
+        cached, use_semantic_cache = await _cached_answer(query, config, answer_key)
+        if cached:
+            return cached
+
+    # 2. LangGraph Execution
+    result = await agent_executor.ainvoke({"messages": [HumanMessage(content=query)]}, config)
+    schedule_prune(thread_id)
+
+    # 3. Source extraction + cache update
+    return await _finalize(query, result["messages"], use_semantic_cache, answer_key)
+
+async def stream_juristway_ai(query: str, thread_id: str, user_email: str = None, plan_type: str = None,
+                              filters: dict = None):
+    """
+    Same flow as run_juristway_ai, but yields events while the graph runs:
+    ("token", {"text"}) for every LLM token, ("tool_start"/"tool_end", {...})
+    for retrieval progress and finally ("done", result).
+    """
+    config = _run_config(thread_id, user_email, plan_type, filters)
+
+    use_semantic_cache, answer_key = False, None
+    if not filters:
+        answer_key = await _answer_cache_key(query)
+        cached, use_semantic_cache = await _cached_answer(query, config, answer_key)
+        if cached:
+            yield "token", {"text": _content_text(cached["answer"])}
+            yield "done", cached
+            return
+
+    async for event in agent_executor.astream_events(
+        {"messages": [HumanMessage(content=query)]}, config, version="v2"
+    ):
+        kind = event["event"]
+        if (
+            kind == "on_chat_model_stream"
+            and event.get("metadata", {}).get("langgraph_node") == "agent"
+            and "summarizer" not in event.get("tags", [])
+        ):
+            text = _content_text(event["data"]["chunk"].content)
+            if text:
+                yield "token", {"text": text}
+        elif kind == "on_tool_start":
+            yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield "tool_end", {"tool": event["name"]}
+
+    schedule_prune(thread_id)
+    snapshot = await agent_executor.aget_state(config)
+    yield "done", await _finalize(query, snapshot.values["messages"], use_semantic_cache, answer_key)
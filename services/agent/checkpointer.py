@@ -0,0 +1,84 @@
+import asyncio
+import logging
+
+from langgraph.checkpoint.memory import MemorySaver
+from pymongo import MongoClient
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sync pymongo client: MongoDBSaver async calls ko executor mein chalata hai
+_mongo_client = None
+# Fire-and-forget prune tasks ka reference, taaki GC beech mein cancel na kare
+_prune_tasks = set()
+
+
+def _get_mongo_client() -> MongoClient:
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = MongoClient(settings.DB_URL)
+    return _mongo_client
+
+
+def build_checkpointer():
+    """
+    Persistent LangGraph checkpointer in MongoDB, shared by every uvicorn
+    worker and surviving restarts. Checkpoints older than CHECKPOINT_TTL_SECONDS
+    are dropped by Mongo's TTL index. CHECKPOINTER_BACKEND=memory keeps the old
+    in-process MemorySaver for local development.
+    """
+    if settings.CHECKPOINTER_BACKEND == "memory":
+        return MemorySaver()
+
+    from langgraph.checkpoint.mongodb import MongoDBSaver
+
+    return MongoDBSaver(
+        _get_mongo_client(),
+        db_name=settings.DB_NAME,
+        checkpoint_collection_name=settings.CHECKPOINT_COLLECTION,
+        writes_collection_name=settings.CHECKPOINT_WRITES_COLLECTION,
+        ttl=settings.CHECKPOINT_TTL_SECONDS,
+    )
+
+
+def _prune_thread(thread_id: str, keep_last: int) -> int:
+    db = _get_mongo_client()[settings.DB_NAME]
+    checkpoints = db[settings.CHECKPOINT_COLLECTION]
+
+    # checkpoint_id time-sortable hota hai; keep_last-th newest se purane sab hatao
+    newest = list(
+        checkpoints.find({"thread_id": thread_id, "checkpoint_ns": ""}, {"checkpoint_id": 1})
+        .sort("checkpoint_id", -1)
+        .skip(keep_last - 1)
+        .limit(1)
+    )
+    if not newest:
+        return 0
+    cutoff = {"thread_id": thread_id, "checkpoint_id": {"$lt": newest[0]["checkpoint_id"]}}
+    deleted = checkpoints.delete_many(cutoff).deleted_count
+    db[settings.CHECKPOINT_WRITES_COLLECTION].delete_many(cutoff)
+    return deleted
+
+
+def schedule_prune(thread_id: str):
+    """
+    Keeps only the latest CHECKPOINT_KEEP_LAST checkpoints of a thread.
+    Runs off the request path; the newest checkpoint already holds the full
+    conversation state, older ones only matter for time-travel.
+    """
+    if settings.CHECKPOINTER_BACKEND == "memory" or settings.CHECKPOINT_KEEP_LAST <= 0:
+        return
+
+    async def prune():
+        try:
+            loop = asyncio.get_running_loop()
+            deleted = await loop.run_in_executor(None, _prune_thread, thread_id, settings.CHECKPOINT_KEEP_LAST)
+            if deleted:
+                logger.debug(f"Pruned {deleted} old checkpoints for thread {thread_id}")
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint pruning failed for thread {thread_id}: {e}")
+
+    task = asyncio.create_task(prune())
+    _prune_tasks.add(task)
+    task.add_done_callback(_prune_tasks.discard)
@@ -0,0 +1,103 @@
+import json
+import logging
+from typing import List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+
+from core.config import settings
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a legal research conversation. "
+    "Merge the existing summary with the new messages into a concise summary "
+    "(max ~250 words). Keep the user's facts, the legal questions asked, the "
+    "Acts/Sections/cases discussed, conclusions reached and source documents cited. "
+    "Drop raw retrieved text."
+)
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content or []
+        )
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content += json.dumps([call.get("args", {}) for call in tool_calls], default=str)
+    return content
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(estimate_tokens(message_text(m)) for m in messages)
+
+
+def _turn_starts(messages: Sequence[BaseMessage]) -> List[int]:
+    """Har HumanMessage ek naya turn shuru karta hai; tool call/response pairs beech mein nahi tootte."""
+    return [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+
+
+def _compact_old_tool_outputs(messages: Sequence[BaseMessage], keep_from: int) -> List[BaseMessage]:
+    """Latest turn se pehle ke verbose tool outputs (10 chunks wale) chhote kar deta hai."""
+    limit = settings.CONTEXT_OLD_TOOL_OUTPUT_CHARS
+    compacted = []
+    for i, message in enumerate(messages):
+        if i < keep_from and message.type == "tool" and isinstance(message.content, str) and len(message.content) > limit:
+            message = message.model_copy(update={"content": message.content[:limit] + "\n[...older tool output trimmed...]"})
+        compacted.append(message)
+    return compacted
+
+
+async def _summarize(summarizer, summary: str, messages: Sequence[BaseMessage]) -> str:
+    transcript = "\n".join(
+        f"{m.type.upper()}: {message_text(m)[:settings.CONTEXT_OLD_TOOL_OUTPUT_CHARS]}"
+        for m in messages
+    )
+    response = await summarizer.ainvoke([
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+    ])
+    return message_text(response).strip()
+
+
+async def build_context(messages: Sequence[BaseMessage], summary: str, summarizer) -> Tuple[List[BaseMessage], list, str]:
+    """
+    Returns (prompt_messages, state_updates, summary).
+
+    - Once history exceeds CONTEXT_SUMMARY_TRIGGER tokens, turns older than the
+      last CONTEXT_KEEP_TURNS are folded into the rolling summary and removed
+      from the thread state.
+    - Tool outputs from earlier turns are trimmed in the prompt.
+    - Oldest remaining turns are dropped from the prompt until it fits in
+      CONTEXT_TOKEN_BUDGET, so every LLM call stays roughly constant in size.
+    """
+    messages = list(messages)
+    updates = []
+
+    starts = _turn_starts(messages)
+    if count_tokens(messages) > settings.CONTEXT_SUMMARY_TRIGGER and len(starts) > settings.CONTEXT_KEEP_TURNS:
+        cut = starts[-settings.CONTEXT_KEEP_TURNS]
+        older, messages = messages[:cut], messages[cut:]
+        try:
+            summary = await _summarize(summarizer, summary, older)
+            updates = [RemoveMessage(id=m.id) for m in older if m.id]
+        except Exception as e:
+            # Summary fail ho toh state mein history rehne do; neeche budget trimming phir bhi chalegi
+            logger.warning(f"⚠️ Conversation summarization failed: {e}")
+
+    starts = _turn_starts(messages)
+    latest_turn = starts[-1] if starts else 0
+    prompt = _compact_old_tool_outputs(messages, latest_turn)
+
+    while count_tokens(prompt) > settings.CONTEXT_TOKEN_BUDGET:
+        starts = _turn_starts(prompt)
+        if len(starts) < 2:
+            break
+        prompt = prompt[starts[1]:]
+
+    if summary:
+        prompt = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + prompt
+    return prompt, updates, summary
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import logging
+import time
+from array import array
+from typing import List
+
+from core.cache import TTLCache
+from core.config import settings
+from core.database import cache_get, cache_setex
+from services.background.usage_writer import usage_writer
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case aur extra whitespace ka farak cache key par asar na kare."""
+    return " ".join(query.lower().split())
+
+
+def _encode_vector(vector: List[float]) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(payload: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(payload))
+    return values.tolist()
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query vectors: in-process LRU+TTL first, then an
+    optional Redis tier shared across workers. Only a miss on both goes to
+    Gemini. Counters are exposed through stats() for the admin dashboard.
+    """
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.memory = TTLCache(maxsize=settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL_SECONDS)
+        self.use_redis = settings.QUERY_CACHE_REDIS_ENABLED
+        self.redis_hits = 0
+        self.embed_calls = 0
+        self.embed_seconds = 0.0
+
+    def _redis_key(self, normalized: str) -> str:
+        model = getattr(self.embeddings, "model", "unknown")
+        dims = getattr(self.embeddings, "output_dimensionality", None)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"qemb:v1:{model}:{dims}:{digest}"
+
+    async def _redis_get(self, key: str):
+        payload = await cache_get(key)
+        return _decode_vector(payload) if payload else None
+
+    async def _redis_set(self, key: str, vector: List[float]):
+        await cache_setex(key, settings.QUERY_CACHE_REDIS_TTL_SECONDS, _encode_vector(vector))
+
+    async def embed_query(self, query: str) -> List[float]:
+        normalized = normalize_query(query)
+        vector = self.memory.get(normalized)
+        if vector is not None:
+            return vector
+
+        redis_key = self._redis_key(normalized)
+        if self.use_redis:
+            vector = await self._redis_get(redis_key)
+            if vector is not None:
+                self.redis_hits += 1
+                self.memory.set(normalized, vector)
+                return vector
+
+        started = time.perf_counter()
+        vector = await self.embeddings.aembed_query(normalized)
+        elapsed = time.perf_counter() - started
+        self.embed_seconds += elapsed
+        self.embed_calls += 1
+        usage_writer.record(
+            kind="embedding",
+            model=getattr(self.embeddings, "model", "unknown"),
+            input_tokens=estimate_tokens(normalized),
+            latency_ms=elapsed * 1000,
+        )
+
+        self.memory.set(normalized, vector)
+        if self.use_redis:
+            await self._redis_set(redis_key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        avg_embed_ms = (self.embed_seconds / self.embed_calls * 1000) if self.embed_calls else 0.0
+        hits = self.memory.hits + self.redis_hits
+        return {
+            "memory": self.memory.stats(),
+            "redis_enabled": self.use_redis,
+            "redis_hits": self.redis_hits,
+            "embed_calls": self.embed_calls,
+            "avg_embed_ms": round(avg_embed_ms, 1),
+            # Har hit ne lagbhag ek average Gemini round-trip bachaya
+            "estimated_saved_ms": round(hits * avg_embed_ms, 1),
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from core.config import settings
+from services.ingestion.sparse import tokenize
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.;:?!])\s+|\n{2,}")
+
+
+def trim_passage(query: str, text: str, max_chars: int) -> str:
+    """
+    Chunk ka sirf woh contiguous hissa jo query terms se sabse zyada match
+    karta hai (max_chars tak), sentence boundaries par. Chhote chunks as-is.
+    """
+    if len(text) <= max_chars:
+        return text
+    sentences = [s for s in SENTENCE_SPLIT_RE.split(text) if s and s.strip()]
+    terms = set(tokenize(query))
+    scores = [len(terms.intersection(tokenize(s))) for s in sentences]
+
+    best_start, best_end, best_score = 0, 0, -1
+    for start in range(len(sentences)):
+        length, score, end = 0, 0, start
+        while end < len(sentences) and length + len(sentences[end]) <= max_chars:
+            length += len(sentences[end]) + 1
+            score += scores[end]
+            end += 1
+        if end > start and score > best_score:
+            best_start, best_end, best_score = start, end, score
+    if best_end == best_start:
+        return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+    passage = " ".join(s.strip() for s in sentences[best_start:best_end])
+    prefix = "… " if best_start > 0 else ""
+    suffix = " …" if best_end < len(sentences) else ""
+    return f"{prefix}{passage}{suffix}"
+
+
+class CrossEncoderReranker:
+    """
+    Small local cross-encoder (ONNX, e.g. ms-marco-MiniLM-L-6) on CPU.
+    The model and tokenizer are loaded lazily from RERANK_MODEL_DIR or
+    downloaded once from the Hugging Face hub. Inference runs on a dedicated
+    thread pool (onnxruntime releases the GIL). If loading fails the reranker
+    disables itself and callers keep the fused retrieval order.
+    """
+
+    def __init__(self):
+        self.enabled = settings.RERANK_ENABLED
+        self.max_length = settings.RERANK_MAX_LENGTH
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._load_lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.calls = 0
+        self.total_ms = 0.0
+
+    def _model_files(self):
+        if settings.RERANK_MODEL_DIR:
+            base = settings.RERANK_MODEL_DIR
+            return os.path.join(base, settings.RERANK_ONNX_FILE), os.path.join(base, "tokenizer.json")
+        from huggingface_hub import hf_hub_download
+        return (
+            hf_hub_download(settings.RERANK_MODEL, settings.RERANK_ONNX_FILE),
+            hf_hub_download(settings.RERANK_MODEL, "tokenizer.json"),
+        )
+
+    def _load(self):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path, tokenizer_path = self._model_files()
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        tokenizer.enable_truncation(max_length=self.max_length)
+        tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = settings.RERANK_THREADS
+        options.inter_op_num_threads = 1
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in session.get_inputs()]
+        self._tokenizer, self._session = tokenizer, session
+        logger.info(f"✅ Reranker loaded: {settings.RERANK_MODEL_DIR or settings.RERANK_MODEL}")
+
+    async def warmup(self) -> bool:
+        if not self.enabled:
+            return False
+        if self._session is not None:
+            return True
+        async with self._load_lock:
+            if self._session is None:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(self._executor, self._load)
+                except Exception as e:
+                    logger.error(f"❌ Reranker load failed, falling back to fused order: {e}")
+                    self.enabled = False
+        return self.enabled
+
+    def _score(self, query: str, passages: List[str]) -> List[float]:
+        import numpy as np
+
+        encodings = self._tokenizer.encode_batch([(query, p) for p in passages])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self._session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+        return logits.reshape(len(passages), -1)[:, 0].tolist()
+
+    async def rerank(self, query: str, points: list, top_n: int) -> list:
+        """Returns the top_n points by cross-encoder score (score set on point.score)."""
+        if not points or not await self.warmup():
+            return points[:top_n]
+        started = time.perf_counter()
+        passages = [(p.payload or {}).get("text", "") for p in points]
+        try:
+            scores = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._score, query, passages
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Rerank failed, using fused order: {e}")
+            return points[:top_n]
+
+        for point, score in zip(points, scores):
+            point.score = score
+        ranked = sorted(points, key=lambda p: p.score, reverse=True)[:top_n]
+        self.calls += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return ranked
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "loaded": self._session is not None,
+            "calls": self.calls,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+        }
+
+
+reranker = CrossEncoderReranker()
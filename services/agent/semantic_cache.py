@@ -0,0 +1,135 @@
+import logging
+import time
+import uuid
+from typing import Optional
+
+from qdrant_client.http import models
+
+from core.config import settings
+from core.database import cache_get, cache_incr, get_async_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_COLLECTION = settings.SEMANTIC_CACHE_COLLECTION
+# Redis counter; exact-match answer cache keys mein shaamil hota hai (brain._answer_cache_key)
+CORPUS_VERSION_KEY = "corpus:version"
+
+
+async def corpus_version() -> str:
+    return await cache_get(CORPUS_VERSION_KEY) or "0"
+
+
+async def invalidate_semantic_cache():
+    """
+    Drops every cached answer. Called whenever the document corpus changes
+    (upload, reindex, delete), because any stored answer may now be stale.
+    Semantic cache points delete hote hain; Redis exact-match answers corpus
+    version bump hone se apne aap miss ho jaate hain (TTL par expire).
+    """
+    await cache_incr(CORPUS_VERSION_KEY)
+    try:
+        client = get_async_qdrant_client()
+        if not await client.collection_exists(SEMANTIC_CACHE_COLLECTION):
+            return
+        await client.delete(
+            collection_name=SEMANTIC_CACHE_COLLECTION,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(must=[
+                    models.FieldCondition(key="created_at", range=models.Range(lte=time.time()))
+                ])
+            ),
+        )
+        logger.info("🧹 Semantic answer cache invalidated.")
+    except Exception as e:
+        logger.warning(f"⚠️ Semantic cache invalidation failed: {e}")
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache over query vectors, stored in a dedicated Qdrant collection.
+    A new question is served from cache when a past question is at least
+    SEMANTIC_CACHE_THRESHOLD cosine-similar and younger than the TTL.
+    """
+
+    def __init__(self, query_cache):
+        self.query_cache = query_cache
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = settings.SEMANTIC_CACHE_TTL_SECONDS
+        self._collection_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    async def _ensure_collection(self, vector_size: int):
+        if self._collection_ready:
+            return
+        client = get_async_qdrant_client()
+        if not await client.collection_exists(SEMANTIC_CACHE_COLLECTION):
+            await client.create_collection(
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+            )
+            await client.create_payload_index(
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                field_name="created_at",
+                field_schema=models.PayloadSchemaType.FLOAT,
+            )
+        self._collection_ready = True
+
+    async def lookup(self, query: str) -> Optional[dict]:
+        try:
+            vector = await self.query_cache.embed_query(query)
+            await self._ensure_collection(len(vector))
+            response = await get_async_qdrant_client().query_points(
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                query=vector,
+                query_filter=models.Filter(must=[
+                    models.FieldCondition(key="created_at", range=models.Range(gte=time.time() - self.ttl))
+                ]),
+                score_threshold=self.threshold,
+                limit=1,
+                with_payload=True,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache lookup failed: {e}")
+            return None
+
+        if not response.points:
+            self.misses += 1
+            return None
+        self.hits += 1
+        point = response.points[0]
+        logger.info(f"🎯 Semantic cache hit (score {point.score:.3f}) for: {query[:60]}")
+        return point.payload
+
+    async def store(self, query: str, answer, source: str, link: Optional[str]):
+        try:
+            vector = await self.query_cache.embed_query(query)
+            await self._ensure_collection(len(vector))
+            await get_async_qdrant_client().upsert(
+                collection_name=SEMANTIC_CACHE_COLLECTION,
+                points=[models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=vector,
+                    payload={
+                        "query": query,
+                        "answer": answer,
+                        "source": source,
+                        "link": link,
+                        "created_at": time.time(),
+                    },
+                )],
+                wait=False,
+            )
+        except Exception as e:
+            # Collection kisi aur worker ne hata di ho toh agli baar dobara banegi
+            self._collection_ready = False
+            logger.warning(f"⚠️ Semantic cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+        }
@@ -1,7 +1,13 @@
+from contextvars import ContextVar
+from typing import Optional
 from langchain_core.tools import tool
-from qdrant_client import QdrantClient
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from core.config import settings
+from qdrant_client.http import models
+from core.database import get_async_qdrant_client
+from services.agent.query_cache import QueryEmbeddingCache
+from services.agent.reranker import reranker, trim_passage
+from services.ingestion.sparse import sparse_encoder, sparse_vector_available
 import logging
 from dotenv import load_dotenv
 
@@ -9,9 +15,8 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
-QDRANT_HOST = "127.0.0.1" # Ya aapka server IP
-QDRANT_PORT = 6333
-COLLECTION_NAME = "legal_knowledge"
+COLLECTION_NAME = settings.QDRANT_COLLECTION
+SPARSE_VECTOR_NAME = settings.SPARSE_VECTOR_NAME
 
 # --- INITIALIZATION ---
 # Gemini Embeddings (Must match PDFManager dimensions: 3072)
@@ -21,35 +26,140 @@ embeddings_model = GoogleGenerativeAIEmbeddings(
     output_dimensionality=768,
     task_type="retrieval_query"
 )
+# Repeat / near-identical queries Gemini tak nahi jaati
+query_embedding_cache = QueryEmbeddingCache(embeddings_model)
 
-# Qdrant Client
-qdrant_client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+# Request-level retrieval scope (ChatRequest.filters), usage_context jaisa contextvar
+search_scope: ContextVar[Optional[dict]] = ContextVar("search_scope", default=None)
 
-@tool
-async def search_legal_documents(query: str):
-    """Searches the Qdrant vector database for relevant legal documents and PDF chunks."""
-    try:
-        # 1. Query ko embedding mein convert karo
-        query_vector = embeddings_model.embed_query(query)
+def set_search_scope(filters: Optional[dict]):
+    search_scope.set(filters or None)
+
+def build_filter(filters: Optional[dict] = None, document_name: Optional[str] = None) -> Optional[models.Filter]:
+    """
+    SearchFilters dict (+ tool ka document_name) -> Qdrant Filter on indexed
+    payload fields (pdf_id, document_name, user_email, page_start/page_end, page_num).
+    """
+    filters = filters or {}
+    must = []
+    if filters.get("pdf_ids"):
+        must.append(models.FieldCondition(key="pdf_id", match=models.MatchAny(any=filters["pdf_ids"])))
+    if filters.get("document_names"):
+        must.append(models.FieldCondition(key="document_name", match=models.MatchAny(any=filters["document_names"])))
+    if document_name:
+        must.append(models.FieldCondition(key="document_name", match=models.MatchValue(value=document_name)))
+    if filters.get("owner"):
+        must.append(models.FieldCondition(key="user_email", match=models.MatchValue(value=filters["owner"])))
+    page_from, page_to = filters.get("page_from"), filters.get("page_to")
+    if page_from is not None or page_to is not None:
+        # Chunk pages page_start..page_end span karta hai: range se overlap ho toh match.
+        # Purane points (page_start/page_end se pehle) ke liye page_num fallback
+        span = []
+        if page_from is not None:
+            span.append(models.FieldCondition(key="page_end", range=models.Range(gte=page_from)))
+        if page_to is not None:
+            span.append(models.FieldCondition(key="page_start", range=models.Range(lte=page_to)))
+        must.append(models.Filter(should=[
+            models.Filter(must=span),
+            models.Filter(must=[
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="page_start")),
+                models.FieldCondition(key="page_num", range=models.Range(gte=page_from, lte=page_to)),
+            ]),
+        ]))
+    return models.Filter(must=must) if must else None
+
+async def hybrid_available() -> bool:
+    """True once the collection has the sparse BM25 vector (purani collection par dense-only fallback)."""
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return False
+    return await sparse_vector_available()
+
+def dense_search_params() -> models.SearchParams:
+    """HNSW ef + quantized search rescoring (non-quantized collection par quantization params ignore hote hain)."""
+    return models.SearchParams(
+        hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF,
+        quantization=models.QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        ),
+    )
+
+async def retrieve(query: str, limit: int = None, search_filter: Optional[models.Filter] = None):
+    """
+    Dense + BM25 sparse candidates ek hi query_points call mein (prefetch),
+    Qdrant ke andar Reciprocal Rank Fusion se merge. Sparse vector na ho toh dense-only.
+    Filter har prefetch mein bhi jata hai, taaki indexed payload par filtered HNSW chale.
+    """
+    limit = limit or settings.RETRIEVAL_TOP_K
+    query_vector = await query_embedding_cache.embed_query(query)
+    client = get_async_qdrant_client()
 
-        # 2. Qdrant mein similarity search karo
-        search_response = qdrant_client.query_points(
+    if await hybrid_available():
+        prefetch_k = max(settings.RETRIEVAL_PREFETCH_K, limit)
+        response = await client.query_points(
+            collection_name=COLLECTION_NAME,
+            prefetch=[
+                models.Prefetch(query=query_vector, filter=search_filter, params=dense_search_params(), limit=prefetch_k),
+                models.Prefetch(query=sparse_encoder.encode_query(query), using=SPARSE_VECTOR_NAME,
+                                filter=search_filter, limit=prefetch_k),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            query_filter=search_filter,
+            limit=limit,
+            with_payload=True,
+        )
+    else:
+        response = await client.query_points(
             collection_name=COLLECTION_NAME,
             query=query_vector,
-            limit=10
+            query_filter=search_filter,
+            search_params=dense_search_params(),
+            limit=limit,
+            with_payload=True,
         )
+    return response.points
+
+async def search_points(query: str, search_filter: Optional[models.Filter] = None, limit: int = None):
+    """Hybrid retrieval + optional rerank; agent tool aur /api/library/search dono yahi use karte hain."""
+    if reranker.enabled:
+        # Over-fetch, local cross-encoder se rerank, sirf best N aage
+        points = await retrieve(query, limit=settings.RERANK_CANDIDATES, search_filter=search_filter)
+        return await reranker.rerank(query, points, limit or settings.RERANK_TOP_N)
+    return await retrieve(query, limit=limit, search_filter=search_filter)
+
+@tool
+async def search_legal_documents(query: str, document_name: Optional[str] = None):
+    """
+    Searches the Qdrant vector database for relevant legal documents and PDF chunks.
+    Pass document_name (exact file name from an earlier 'Source:' line) to search
+    only inside that document, e.g. a specific Act.
+    """
+    try:
+        # 1+2. Query embedding (LRU/Redis cache) + hybrid dense/BM25 search (RRF),
+        # request scope (ChatRequest.filters) + tool ka document_name filter ke saath
+        search_filter = build_filter(search_scope.get(), document_name)
+        points = await search_points(query, search_filter)
 
-        if not search_response.points:
+        if not points:
             return "No relevant legal documents found in the database."
 
         # 3. Formatted string banao (Yahan change hai)
         formatted_chunks = []
-        for point in search_response.points: # <--- .points par loop chalana hai
+        for point in points:
             metadata = point.payload
+            page = metadata.get('page_num', 'N/A')
+            if metadata.get('page_end') and metadata.get('page_end') != metadata.get('page_start'):
+                page = f"{metadata.get('page_start')}-{metadata.get('page_end')}"
+            section = f"Section: {metadata['section']}\n" if metadata.get('section') else ""
+            content = metadata.get('text', '')
+            if reranker.enabled:
+                # Poora chunk nahi, sirf query se relevant passage
+                content = trim_passage(query, content, settings.RERANK_PASSAGE_CHARS)
             chunk_text = (
                 f"Source: {metadata.get('document_name', 'unknown.pdf')}\n"
-                f"Page: {metadata.get('page_num', 'N/A')}\n"
-                f"Content: {metadata.get('text', '')}"
+                f"Page: {page}\n"
+                f"{section}"
+                f"Content: {content}"
             )
             formatted_chunks.append(chunk_text)
 
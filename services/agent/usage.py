@@ -0,0 +1,47 @@
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from services.background.usage_writer import usage_writer
+
+
+class UsageCallbackHandler(AsyncCallbackHandler):
+    """
+    Records input/output tokens and latency of every chat-model call made
+    while answering one request (agent turns, summarizer) into the buffered
+    token-usage writer. Gemini's usage_metadata is used as reported.
+    """
+
+    def __init__(self, user_email: Optional[str], plan_type: Optional[str]):
+        self.user_email = user_email
+        self.plan_type = plan_type
+        self._runs: Dict[UUID, tuple] = {}
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID,
+                                  metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("kwargs", {}).get("model", "unknown")
+        self._runs[run_id] = (time.perf_counter(), model)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        started, model = self._runs.pop(run_id, (time.perf_counter(), "unknown"))
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None and getattr(message, "usage_metadata", None):
+                    usage = message.usage_metadata
+        usage_writer.record(
+            kind="llm",
+            model=model,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            latency_ms=(time.perf_counter() - started) * 1000,
+            user_email=self.user_email,
+            plan_type=self.plan_type,
+        )
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._runs.pop(run_id, None)
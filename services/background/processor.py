@@ -59,12 +59,11 @@
 #     # NOTE: Yahan 'os.remove' mat karna! 
 #     # Humein file 'storage/pdfs' mein chahiye taaki user use dekh sake.
 
-import asyncio
-import os
 import logging
 from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
 from services.ingestion.pdf_engine import PDFManager
-from core.database import connect_to_mongo, get_documents_collection, get_knowledge_base_collection
+from core.database import get_documents_collection
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -73,50 +72,58 @@ logger = logging.getLogger(__name__)
 # PDFManager instance
 pdf_manager = PDFManager()
 
-async def process_document_job(file_path: str, pdf_id: str, title: str, owner_email: str):
+async def process_document_job(file_path: str, pdf_id: str, title: str, owner_email: str, attempt: int = 1,
+                               ingest: Optional[Callable[..., Awaitable[int]]] = None):
     """
     Sahi version: Status 'documents' mein update hoga aur chunks 'knowledge_base' mein jayenge.
+    Errors raise hote hain taaki job queue retry kar sake; final failure par
+    worker mark_document_failed() call karta hai. Mongo connection worker
+    process startup par ek baar banta hai. `ingest` default save_to_mongo_and_qdrant
+    hai; doc worker pipelined IngestionPipeline.ingest pass karta hai.
     """
-    await connect_to_mongo()
-    
-    # Do alag collections
+    ingest = ingest or pdf_manager.save_to_mongo_and_qdrant
     docs_coll = get_documents_collection()        # Status ke liye
-    
-    try:
-        # 1. Update Status: Processing start (In Documents Collection)
-        await docs_coll.update_one(
-            {"pdf_id": pdf_id},
-            {"$set": {"status": "processing"}}
-        )
-
-        # 2. PDF Processing: 
-        # Ye chunks ko 'knowledge_base' collection aur Qdrant mein save karega
-        num_chunks = await pdf_manager.save_to_mongo_and_qdrant(
-            pdf_path=file_path,
-            document_name=title,
-            user_email=owner_email,
-            pdf_id=pdf_id  # Linker ID
-        )
-
-        # 3. Update Status: Success (In Documents Collection)
-        await docs_coll.update_one(
-            {"pdf_id": pdf_id},
-            {
-                "$set": {
-                    "status": "ready",
-                    "chunk_count": num_chunks,
-                    "processed_at": datetime.now(timezone.utc)
-                }
-            }
-        )
-        logger.info(f"✅ Successfully processed {title} with {num_chunks} chunks.")
-
-    except Exception as e:
-        logger.error(f"❌ Error processing {title}: {str(e)}")
-        # Error status update
-        await docs_coll.update_one(
-            {"pdf_id": pdf_id},
-            {"$set": {"status": "failed", "error_str": str(e)}}
-        )
-    
-    # File storage mein hi rahegi, delete nahi hogi.
\ No newline at end of file
+
+    # 1. Update Status: Processing start (In Documents Collection)
+    await docs_coll.update_one(
+        {"pdf_id": pdf_id},
+        {"$set": {"status": "processing", "attempts": attempt}}
+    )
+
+    # Naya data pehle likha jata hai (point_id par upsert, retry idempotent); pichle attempt /
+    # purane ingest ke stale chunks sirf success ke baad hatte hain
+    started = datetime.now(timezone.utc)
+
+    # 2. PDF Processing: 
+    # Ye chunks ko 'knowledge_base' collection aur Qdrant mein save karega
+    num_chunks = await ingest(
+        pdf_path=file_path,
+        document_name=title,
+        user_email=owner_email,
+        pdf_id=pdf_id  # Linker ID
+    )
+    point_ids = await pdf_manager.point_ids_written_since(pdf_id, started)
+    await pdf_manager.delete_stale_chunks(pdf_id, point_ids, written_since=started)
+
+    # 3. Update Status: Success (In Documents Collection)
+    await docs_coll.update_one(
+        {"pdf_id": pdf_id},
+        {
+            "$set": {
+                "status": "ready",
+                "chunk_count": num_chunks,
+                "processed_at": datetime.now(timezone.utc)
+            },
+            "$unset": {"error_str": ""}
+        }
+    )
+    logger.info(f"✅ Successfully processed {title} with {num_chunks} chunks.")
+    # File storage mein hi rahegi, delete nahi hogi.
+    return num_chunks
+
+async def mark_document_failed(pdf_id: str, error: str):
+    """Retries khatam hone ke baad document ko failed mark karta hai."""
+    await get_documents_collection().update_one(
+        {"pdf_id": pdf_id},
+        {"$set": {"status": "failed", "error_str": error}}
+    )
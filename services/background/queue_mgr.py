@@ -1,18 +1,187 @@
-import asyncio
+import logging
+import socket
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from core.config import settings
+from core.database import get_jobs_collection
 from dotenv import load_dotenv
 load_dotenv()
-# The queue stores document processing jobs
-# A 'job' is typically a dictionary containing file_path, user_id, and doc_id
-document_queue = asyncio.Queue()
 
-async def add_to_queue(job_data: dict):
+logger = logging.getLogger(__name__)
+
+# Durable job queue on the Mongo "jobs" collection.
+# Lifecycle: queued -> running (lease) -> done | queued (retry with backoff) | dead
+# A running job whose lease expires (worker crashed/restarted) becomes claimable again.
+
+INGEST_DOCUMENT = "ingest_document"
+
+_indexes_ready = False
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def ensure_job_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    coll = get_jobs_collection()
+    await coll.create_index([("status", 1), ("available_at", 1)])
+    await coll.create_index([("status", 1), ("lease_expires_at", 1)])
+    await coll.create_index("payload.pdf_id")
+    _indexes_ready = True
+
+
+async def enqueue_job(job_type: str, payload: dict, max_attempts: Optional[int] = None) -> str:
+    """
+    Adds a job to the durable queue and returns its id.
+    Example payload: {"file_path": "storage/pdfs/x.pdf", "pdf_id": "...", "title": "...", "owner_email": "..."}
+    """
+    await ensure_job_indexes()
+    now = datetime.now(timezone.utc)
+    result = await get_jobs_collection().insert_one({
+        "type": job_type,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "available_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "last_error": None,
+        "created_at": now,
+        "updated_at": now,
+    })
+    logger.info(f"📥 Job {result.inserted_id} ({job_type}) queued")
+    return str(result.inserted_id)
+
+
+async def claim_job(worker_id: str, job_types: Optional[List[str]] = None) -> Optional[dict]:
     """
-    Adds a new processing job to the queue.
-    Example job_data: {"file_path": "temp/doc.pdf", "owner": "user@example.com"}
+    Atomically leases the oldest available job: queued and due, or running with
+    an expired lease (visibility timeout). Returns None if nothing is claimable.
     """
-    await document_queue.put(job_data)
-    print(f"📥 Job added to queue. Current queue size: {document_queue.qsize()}")
+    now = datetime.now(timezone.utc)
+    query = {
+        "$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+        ],
+        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+    }
+    if job_types:
+        query["type"] = {"$in": job_types}
+    return await get_jobs_collection().find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("available_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def heartbeat(job_id: ObjectId, worker_id: str) -> bool:
+    """Extends the lease; False means the lease was lost (another worker may own the job now)."""
+    now = datetime.now(timezone.utc)
+    result = await get_jobs_collection().update_one(
+        {"_id": job_id, "status": "running", "lease_owner": worker_id},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS), "updated_at": now}},
+    )
+    return result.matched_count == 1
+
+
+async def complete_job(job_id: ObjectId, worker_id: str):
+    await get_jobs_collection().update_one(
+        {"_id": job_id, "lease_owner": worker_id},
+        {"$set": {
+            "status": "done",
+            "lease_expires_at": None,
+            "finished_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+        }},
+    )
+
+
+async def fail_job(job: dict, worker_id: str, error: str) -> bool:
+    """
+    Re-queues the job with exponential backoff, or marks it dead once
+    max_attempts is used up. Returns True if the job is now dead.
+    """
+    now = datetime.now(timezone.utc)
+    dead = job["attempts"] >= job["max_attempts"]
+    update = {"last_error": error[:2000], "lease_expires_at": None, "updated_at": now}
+    if dead:
+        update.update(status="dead", finished_at=now)
+    else:
+        delay = min(
+            settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** (job["attempts"] - 1)),
+            settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+        )
+        update.update(status="queued", available_at=now + timedelta(seconds=delay))
+    await get_jobs_collection().update_one({"_id": job["_id"], "lease_owner": worker_id}, {"$set": update})
+    return dead
+
+
+async def reap_expired_jobs() -> List[dict]:
+    """
+    Running jobs whose lease expired on their final attempt can never be
+    claimed again; mark them dead and return them so the caller can clean up.
+    """
+    now = datetime.now(timezone.utc)
+    coll = get_jobs_collection()
+    query = {
+        "status": "running",
+        "lease_expires_at": {"$lt": now},
+        "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+    }
+    reaped = []
+    while True:
+        job = await coll.find_one_and_update(
+            query,
+            {"$set": {"status": "dead", "last_error": "lease expired on final attempt", "finished_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return reaped
+        reaped.append(job)
+
+
+async def get_queue_size() -> int:
+    """Returns the number of jobs waiting to be processed."""
+    return await get_jobs_collection().count_documents({"status": "queued"})
+
 
-def get_queue_size() -> int:
-    """Returns the number of documents waiting to be processed."""
-    return document_queue.qsize()
\ No newline at end of file
+async def queue_stats() -> dict:
+    rows = await get_jobs_collection().aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    counts = {r["_id"]: r["count"] for r in rows}
+    oldest = await get_jobs_collection().find_one(
+        {"status": "queued"}, sort=[("available_at", 1)], projection={"available_at": 1}
+    )
+    lag = None
+    if oldest:
+        available_at = oldest["available_at"]
+        if available_at.tzinfo is None:
+            available_at = available_at.replace(tzinfo=timezone.utc)
+        lag = max(0.0, (datetime.now(timezone.utc) - available_at).total_seconds())
+    return {
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "dead": counts.get("dead", 0),
+        "oldest_queued_lag_seconds": round(lag, 1) if lag is not None else None,
+    }
@@ -0,0 +1,106 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+from core.database import get_token_usage_collection, get_token_usage_daily_collection
+
+logger = logging.getLogger(__name__)
+
+_indexes_ready = False
+
+
+def rollup_key(day: str, plan_type: str, user_email: str) -> str:
+    return f"{day}|{plan_type}|{user_email}"
+
+
+async def ensure_rollup_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    coll = get_token_usage_daily_collection()
+    await coll.create_index("day")
+    await coll.create_index([("user_email", 1), ("day", 1)])
+    _indexes_ready = True
+
+
+async def apply_usage_rollups(records: List[dict]):
+    """
+    Incrementally folds freshly written token_usage records into the
+    per-day / per-plan / per-user counters in token_usage_daily.
+    """
+    if not records:
+        return
+    totals = defaultdict(lambda: {"tokens_used": 0, "input_tokens": 0, "output_tokens": 0, "requests": 0})
+    for r in records:
+        day = r["timestamp"].astimezone(timezone.utc).strftime("%Y-%m-%d")
+        bucket = totals[(day, r["plan_type"], r["user_email"])]
+        bucket["tokens_used"] += r.get("tokens_used", 0)
+        bucket["input_tokens"] += r.get("input_tokens", 0)
+        bucket["output_tokens"] += r.get("output_tokens", 0)
+        bucket["requests"] += 1
+
+    await ensure_rollup_indexes()
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne(
+            {"_id": rollup_key(day, plan_type, user_email)},
+            {
+                "$inc": counters,
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"day": day, "plan_type": plan_type, "user_email": user_email},
+            },
+            upsert=True,
+        )
+        for (day, plan_type, user_email), counters in totals.items()
+    ]
+    await get_token_usage_daily_collection().bulk_write(ops, ordered=False)
+
+
+async def rebuild_usage_rollups(days: Optional[int] = None) -> int:
+    """
+    Recomputes rollups from the raw token_usage collection (for backfills,
+    seeded data, or after a failed incremental update). With `days`, only
+    that trailing window is rebuilt; older rollup docs are left untouched.
+    """
+    await ensure_rollup_indexes()
+    daily = get_token_usage_daily_collection()
+    pipeline = []
+    if days is not None:
+        start = (datetime.now(timezone.utc) - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        pipeline.append({"$match": {"timestamp": {"$gte": start}}})
+        await daily.delete_many({"day": {"$gte": start.strftime("%Y-%m-%d")}})
+    else:
+        await daily.delete_many({})
+
+    pipeline += [
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "plan_type": {"$ifNull": ["$plan_type", "Unknown"]},
+                "user_email": {"$ifNull": ["$user_email", "system"]},
+            },
+            "tokens_used": {"$sum": {"$ifNull": ["$tokens_used", 0]}},
+            "input_tokens": {"$sum": {"$ifNull": ["$input_tokens", 0]}},
+            "output_tokens": {"$sum": {"$ifNull": ["$output_tokens", 0]}},
+            "requests": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.day", "|", "$_id.plan_type", "|", "$_id.user_email"]},
+            "day": "$_id.day",
+            "plan_type": "$_id.plan_type",
+            "user_email": "$_id.user_email",
+            "tokens_used": 1,
+            "input_tokens": 1,
+            "output_tokens": 1,
+            "requests": 1,
+            "updated_at": "$$NOW",
+        }},
+        {"$merge": {"into": daily.name, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await get_token_usage_collection().aggregate(pipeline).to_list(None)
+    count = await daily.count_documents({})
+    logger.info(f"✅ Token usage rollups rebuilt: {count} daily docs")
+    return count
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from core.config import settings
+from core.database import get_token_usage_collection
+from services.background.usage_rollups import apply_usage_rollups
+
+logger = logging.getLogger(__name__)
+
+# Kis user/plan ke liye call ho rahi hai; chat request ya ingestion job set karta hai
+usage_context: ContextVar[dict] = ContextVar("usage_context", default={})
+
+
+def set_usage_context(user_email: Optional[str], plan_type: Optional[str]):
+    usage_context.set({"user_email": user_email, "plan_type": plan_type})
+
+
+class UsageWriter:
+    """
+    Buffers token-usage records in memory and writes them to `token_usage`
+    with insert_many from a background task, so LLM/embedding calls never
+    wait on Mongo. The buffer is bounded; when Mongo is unreachable the oldest
+    records are dropped (and counted) instead of growing without limit.
+    """
+
+    def __init__(self):
+        self._buffer = deque(maxlen=settings.USAGE_BUFFER_MAX)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, kind: str, model: str, input_tokens: int, output_tokens: int = 0,
+               latency_ms: float = 0.0, user_email: Optional[str] = None, plan_type: Optional[str] = None):
+        ctx = usage_context.get()
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append({
+            "user_email": user_email or ctx.get("user_email") or "system",
+            "plan_type": plan_type or ctx.get("plan_type") or "Unknown",
+            "kind": kind,
+            "model": model,
+            "input_tokens": int(input_tokens or 0),
+            "output_tokens": int(output_tokens or 0),
+            "tokens_used": int(input_tokens or 0) + int(output_tokens or 0),
+            "latency_ms": round(latency_ms, 1),
+            "timestamp": datetime.now(timezone.utc),
+        })
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:
+            # Event loop nahi hai (sync context); agla async record flusher start karega
+            pass
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.USAGE_FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    async def flush(self):
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < settings.USAGE_FLUSH_BATCH:
+                batch.append(self._buffer.popleft())
+            try:
+                await get_token_usage_collection().insert_many(batch, ordered=False)
+                self.written += len(batch)
+            except Exception as e:
+                # Records wapas buffer mein; agli flush dobara try karegi
+                self._buffer.extendleft(reversed(batch))
+                logger.warning(f"⚠️ Token usage flush failed ({len(batch)} records pending): {e}")
+                return
+            try:
+                await apply_usage_rollups(batch)
+            except Exception as e:
+                # Raw records safe hain; rebuild_usage_rollups se dobara ban jayenge
+                logger.warning(f"⚠️ Token usage rollup update failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buffer), "written": self.written, "dropped": self.dropped}
+
+
+usage_writer = UsageWriter()
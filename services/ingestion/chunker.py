@@ -0,0 +1,228 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from core.config import settings
+from utils.tokens import estimate_tokens
+
+HEADING_KEYWORD = r"(?i:section|sec\.|article|art\.|chapter|part|schedule|rule|order|regulation|clause)"
+HEADING_NUMBER = r"(?:\d+|[IVXLCDM]+)[A-Z]?"
+# Major headings (ek line par match): naya section shuru hota hai aur chunk yahin toot-ta hai.
+# Sirf heading jaisi lines; "Section 138 of the NI Act provides..." jaisa prose heading nahi hai.
+SECTION_HEADING_RE = re.compile(
+    r"^\s*(?:"
+    # Akeli line: "CHAPTER XVI", "Section 302.", "Rule 5:"
+    rf"{HEADING_KEYWORD}\s+{HEADING_NUMBER}\s*[.:—–-]?\s*$"
+    # Number + punctuation + title: "Section 302. Punishment for murder.—", "Article 21 — Protection of life"
+    rf"|{HEADING_KEYWORD}\s+{HEADING_NUMBER}\s*[.:—–-]\s*[A-Z][^\n]{{2,150}}?(?:[.,]?\s*[—–-]|\.?\s*$)"
+    # All caps: "SECTION 138 OF THE NEGOTIABLE INSTRUMENTS ACT, 1881"
+    rf"|(?:SECTION|SEC\.|ARTICLE|ART\.|CHAPTER|PART|SCHEDULE|RULE|ORDER|REGULATION|CLAUSE)\s+{HEADING_NUMBER}\b[^a-z\n]{{0,120}}$"
+    # Bare-act style: "302. Punishment for murder.—"
+    r"|\d{1,4}[A-Z]{0,2}\.\s+[A-Z][^\n]{2,150}?[.,]?\s*[—–-]"
+    r")"
+)
+# Keyword + number akele (title line nahi), e.g. "CHAPTER XVI" / "PART III"
+BARE_HEADING_RE = re.compile(rf"^\s*{HEADING_KEYWORD}\s+{HEADING_NUMBER}\s*[.:—–-]?\s*$")
+# Sub-clauses / numbered paragraphs: boundary maante hain, section label nahi badalte.
+# e.g. "(1)", "(a)", "(iv)", "a)", "12." (judgment paragraphs)
+CLAUSE_RE = re.compile(r"^\s*(?:\(\s*(?:\d{1,3}|[a-z]{1,2}|[ivxlc]{1,6})\s*\)|[a-z]\)|\d{1,3}[.)])\s+", re.IGNORECASE)
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.;:?!])\s+(?=[A-Z(\"'])")
+MAX_SECTION_LABEL_CHARS = 120
+# Chunking logic badle toh bump karo: reindex.py isse manifest mein compare karta hai
+CHUNKER_VERSION = "legal-v3"
+
+
+@dataclass
+class _Unit:
+    text: str
+    page: int
+    tokens: int
+
+
+class LegalChunker:
+    """
+    Structure-aware chunker for statutes, judgments and contracts.
+    Text is cut into units at Section/Article/Chapter headings, sub-clause
+    markers and paragraph breaks; units are then packed into windows of at
+    most `max_tokens`, carrying ~`overlap_tokens` of trailing text into the
+    next window of the same section. A new major heading always starts a new
+    chunk; only a pending heading with no body (e.g. a bare "CHAPTER XVI"
+    title) is kept as context for the next section. A heading that sits in
+    its own paragraph stays in the same window as the first part of its
+    body. Each chunk records page_start/page_end and its section label.
+    """
+
+    def __init__(self, max_tokens: int = None, overlap_tokens: int = None, min_tokens: int = None):
+        self.max_tokens = max(32, max_tokens or settings.CHUNK_MAX_TOKENS)
+        overlap = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.overlap_tokens = max(0, min(overlap, self.max_tokens // 2))
+        minimum = settings.CHUNK_MIN_TOKENS if min_tokens is None else min_tokens
+        self.min_tokens = max(0, min(minimum, self.max_tokens // 2))
+
+    # --- Unit extraction ---
+
+    @staticmethod
+    def _segments(text: str) -> List[str]:
+        """Paragraphs, further split at heading / clause lines (OCR text often lacks blank lines)."""
+        segments = []
+        for paragraph in PARAGRAPH_SPLIT_RE.split(text):
+            current = []
+            for line in paragraph.splitlines():
+                if current and (SECTION_HEADING_RE.match(line) or CLAUSE_RE.match(line)):
+                    segments.append("\n".join(current))
+                    current = []
+                if line.strip():
+                    current.append(line.rstrip())
+            if current:
+                segments.append("\n".join(current))
+        return [s.strip() for s in segments if s.strip()]
+
+    def _split_oversized(self, text: str, first_budget: int = None) -> List[str]:
+        """
+        Ek unit max_tokens se bada ho toh sentences, phir words par todte hain.
+        first_budget: pehle piece ki limit (window mein pehle se pending heading ke tokens minus).
+        """
+        first_budget = first_budget or self.max_tokens
+        if estimate_tokens(text) <= first_budget:
+            return [text]
+        pieces, current = [], ""
+        for sentence in SENTENCE_SPLIT_RE.split(text):
+            candidate = f"{current} {sentence}".strip()
+            limit = self.max_tokens if pieces else first_budget
+            if current and estimate_tokens(candidate) > limit:
+                pieces.append(current)
+                current = sentence
+            else:
+                current = candidate
+        if current:
+            pieces.append(current)
+
+        result = []
+        for piece in pieces:
+            if estimate_tokens(piece) <= (self.max_tokens if result else first_budget):
+                result.append(piece)
+                continue
+            words, current = piece.split(), []
+            for word in words:
+                limit = self.max_tokens if result else first_budget
+                if current and estimate_tokens(" ".join(current + [word])) > limit:
+                    result.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                result.append(" ".join(current))
+        return result
+
+    # --- Windowing ---
+
+    def _overlap_units(self, units: List[_Unit]) -> List[_Unit]:
+        """Window ke aakhri units (ya aakhri unit ki tail) jo overlap budget mein aate hain."""
+        if not self.overlap_tokens:
+            return []
+        carried, budget = [], self.overlap_tokens
+        for unit in reversed(units):
+            if unit.tokens <= budget:
+                carried.insert(0, unit)
+                budget -= unit.tokens
+                continue
+            if not carried:
+                # Word boundary par tail kaato
+                tail = unit.text[-self.overlap_tokens * 4:]
+                tail = tail.split(" ", 1)[1] if " " in tail else tail
+                carried.insert(0, _Unit(tail, unit.page, estimate_tokens(tail)))
+            break
+        return carried
+
+    @staticmethod
+    def _section_label(segment: str) -> str:
+        # "302. Punishment for murder.—Whoever ..." -> "302. Punishment for murder."
+        line = segment.splitlines()[0].strip()
+        return re.split(r"\s*[—–]\s*", line, maxsplit=1)[0][:MAX_SECTION_LABEL_CHARS]
+
+    def _is_title_only(self, segment: str) -> bool:
+        """
+        Bina body wali heading: "CHAPTER XVI" + optional all-caps title line
+        ("OF OFFENCES AFFECTING THE HUMAN BODY"). Aisi heading agle section mein fold hoti hai.
+        """
+        lines = segment.splitlines()
+        return (
+            bool(BARE_HEADING_RE.match(lines[0]))
+            and not any(ch.islower() for line in lines[1:] for ch in line)
+            and estimate_tokens(segment) < max(self.min_tokens, 1)
+        )
+
+    @staticmethod
+    def _make_chunk(units: List[_Unit], section: Optional[str]) -> Dict:
+        text = "\n\n".join(u.text for u in units)
+        page_start = min(u.page for u in units)
+        return {
+            "text": text,
+            "page_num": page_start,
+            "page_start": page_start,
+            "page_end": max(u.page for u in units),
+            "section": section,
+            "token_count": estimate_tokens(text),
+        }
+
+    def chunk_pages(self, pages: List[Dict]) -> List[Dict]:
+        """pages: [{"page": int, "text": str}, ...] in page order."""
+        chunks: List[Dict] = []
+        window: List[_Unit] = []
+        window_tokens = 0
+        section: Optional[str] = None
+        # Sirf naye units wali window hi flush hoti hai (overlap-only window nahi)
+        has_new_content = False
+        # Window ka naya content sirf body-less headings hai (e.g. "CHAPTER XVI")
+        title_only = True
+        # Window ka naya content sirf current section ki heading line/segment hai
+        pending_heading = False
+
+        def flush(carry_overlap: bool):
+            nonlocal window, window_tokens, has_new_content, title_only, pending_heading
+            if window and has_new_content:
+                chunks.append(self._make_chunk(window, section))
+            window = self._overlap_units(window) if carry_overlap else []
+            window_tokens = sum(u.tokens for u in window)
+            has_new_content = False
+            title_only = True
+            pending_heading = False
+
+        for page in pages:
+            for segment in self._segments(page.get("text") or ""):
+                is_heading = bool(SECTION_HEADING_RE.match(segment.splitlines()[0]))
+                if is_heading:
+                    # Pending body wala text (chahe kitna bhi chhota) apne hi section label ke saath flush;
+                    # sirf bare chapter/part title naye section ke saath jata hai
+                    if has_new_content and not title_only:
+                        flush(carry_overlap=False)
+                    elif not has_new_content:
+                        window, window_tokens = [], 0
+                    section = self._section_label(segment)
+                is_title = self._is_title_only(segment)
+
+                # Pending heading / chhota text akela chunk nahi banta: agle segment ka pehla
+                # piece bache hue budget mein kaata jata hai taaki heading body ke saath rahe
+                first_budget = None
+                if has_new_content and (pending_heading or window_tokens < self.min_tokens):
+                    if window_tokens < self.max_tokens:
+                        first_budget = self.max_tokens - window_tokens
+
+                flushed_before = len(chunks)
+                for piece in self._split_oversized(segment, first_budget):
+                    unit = _Unit(piece, page["page"], estimate_tokens(piece))
+                    if window and window_tokens + unit.tokens > self.max_tokens:
+                        flush(carry_overlap=True)
+                        # Overlap + naya unit bhi fit na ho toh overlap chhod do
+                        if window_tokens + unit.tokens > self.max_tokens:
+                            window, window_tokens = [], 0
+                    window.append(unit)
+                    window_tokens += unit.tokens
+                    has_new_content = True
+                    # Har flush ke baad dobara: is segment ka body ab window mein hai
+                    if not is_title:
+                        title_only = False
+                pending_heading = is_heading and len(chunks) == flushed_before
+
+        flush(carry_overlap=False)
+        return chunks
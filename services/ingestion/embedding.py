@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from core.config import settings
+from core.database import get_embedding_cache_collection
+from services.background.usage_writer import usage_writer
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Inme se koi bhi marker error mein ho toh batch dobara try karte hain
+RETRYABLE_MARKERS = ("429", "resource_exhausted", "rate limit", "quota", "503", "unavailable", "timeout", "deadline")
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache in Mongo, keyed on
+    (model, dimensionality, task_type, sha256(text)). Hits refresh last_used_at
+    and a TTL index on that field evicts entries that have not been used for
+    EMBED_CACHE_TTL_DAYS, so the collection only keeps the live corpus.
+    """
+
+    LOOKUP_BATCH = 500
+
+    def __init__(self, model: str, dimensionality: Optional[int], task_type: Optional[str]):
+        self.model = model
+        self.dimensionality = dimensionality
+        self.task_type = task_type or "retrieval_document"
+        self._indexes_ready = False
+
+    @classmethod
+    def for_embeddings(cls, embeddings, default_task_type: str = "retrieval_document"):
+        return cls(
+            model=getattr(embeddings, "model", "unknown"),
+            dimensionality=getattr(embeddings, "output_dimensionality", None),
+            task_type=getattr(embeddings, "task_type", None) or default_task_type,
+        )
+
+    def key(self, text: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model}|{self.dimensionality}|{self.task_type}|{text_hash}"
+
+    async def _ensure_indexes(self, coll):
+        if self._indexes_ready:
+            return
+        await coll.create_index(
+            "last_used_at",
+            expireAfterSeconds=settings.EMBED_CACHE_TTL_DAYS * 24 * 3600,
+        )
+        self._indexes_ready = True
+
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        coll = get_embedding_cache_collection()
+        await self._ensure_indexes(coll)
+
+        found = {}
+        for i in range(0, len(keys), self.LOOKUP_BATCH):
+            batch = keys[i:i + self.LOOKUP_BATCH]
+            async for doc in coll.find({"_id": {"$in": batch}}, {"vector": 1}):
+                found[doc["_id"]] = doc["vector"]
+
+        if found:
+            await coll.update_many(
+                {"_id": {"$in": list(found)}},
+                {"$set": {"last_used_at": datetime.now(timezone.utc)}}
+            )
+        return found
+
+    async def put_many(self, entries: Dict[str, List[float]]):
+        if not entries:
+            return
+        coll = get_embedding_cache_collection()
+        now = datetime.now(timezone.utc)
+        docs = [
+            {
+                "_id": key,
+                "model": self.model,
+                "dimensionality": self.dimensionality,
+                "task_type": self.task_type,
+                "vector": vector,
+                "created_at": now,
+                "last_used_at": now,
+            }
+            for key, vector in entries.items()
+        ]
+        try:
+            await coll.insert_many(docs, ordered=False)
+        except Exception as e:
+            # Duplicate keys (doosre worker ne pehle hi likh diya) ignore karte hain
+            logger.debug(f"Embedding cache insert partially skipped: {e}")
+
+
+class BatchEmbedder:
+    """
+    Splits texts into fixed-size batches and embeds them with a bounded number
+    of concurrent requests. Each batch retries on its own with exponential
+    backoff, so a single 429 no longer fails the whole document.
+    """
+
+    def __init__(self, embeddings, batch_size: int = None, concurrency: int = None, max_retries: int = None,
+                 cache: Optional[EmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = max(1, batch_size or settings.EMBED_BATCH_SIZE)
+        self.concurrency = max(1, concurrency or settings.EMBED_CONCURRENCY)
+        self.max_retries = settings.EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    started = time.perf_counter()
+                    vectors = await loop.run_in_executor(None, self.embeddings.embed_documents, batch)
+                    usage_writer.record(
+                        kind="embedding",
+                        model=getattr(self.embeddings, "model", "unknown"),
+                        input_tokens=sum(estimate_tokens(t) for t in batch),
+                        latency_ms=(time.perf_counter() - started) * 1000,
+                    )
+                    return vectors
+                except Exception as e:
+                    if attempt >= self.max_retries or not _is_retryable(e):
+                        raise
+                    delay = min(settings.EMBED_BACKOFF_BASE * (2 ** attempt), settings.EMBED_BACKOFF_MAX)
+                    delay += random.uniform(0, settings.EMBED_BACKOFF_BASE)
+                    logger.warning(f"⏳ Embedding batch failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        elapsed = max(time.perf_counter() - started, 1e-6)
+
+        tokens = sum(estimate_tokens(t) for t in texts)
+        logger.info(
+            f"🧮 Embedded {len(texts)} chunks in {len(batches)} batches, {elapsed:.2f}s "
+            f"({len(texts) / elapsed:.1f} chunks/s, ~{tokens / elapsed:.0f} tokens/s)"
+        )
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self.cache is None:
+            return await self._embed_uncached(texts)
+
+        # Same text ek hi baar embed hota hai, chahe document mein kitni baar aaye
+        keys = [self.cache.key(t) for t in texts]
+        try:
+            cached = await self.cache.get_many(list(dict.fromkeys(keys)))
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding cache lookup failed, embedding everything: {e}")
+            cached = {}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = await self._embed_uncached(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            try:
+                await self.cache.put_many(fresh)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding cache write failed: {e}")
+            cached.update(fresh)
+
+        logger.info(f"🗃️ Embedding cache: {len(texts) - len(missing)}/{len(texts)} chunks served from cache")
+        return [cached[key] for key in keys]
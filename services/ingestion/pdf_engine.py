@@ -127,22 +127,83 @@ import asyncio
 from datetime import datetime, timezone
 from email.mime import image
 import uuid
+import logging
 from typing import List, Dict
-from fastapi import logger
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
-from qdrant_client import QdrantClient
+from pymongo import ReplaceOne
 from qdrant_client.http import models
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from core.config import settings
-from core.database import get_knowledge_base_collection # MongoDB metadata ke liye
+from services.ingestion.chunker import LegalChunker
+from services.ingestion.embedding import BatchEmbedder, EmbeddingCache
+from services.ingestion.sparse import sparse_encoder, sparse_vector_available
+from services.agent.semantic_cache import invalidate_semantic_cache
+from services.background.usage_writer import set_usage_context
+from core.database import get_async_qdrant_client, get_documents_collection, get_knowledge_base_collection, get_qdrant_client # MongoDB metadata ke liye
 import os
 import platform
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from qdrant_client.http import models
-# Qdrant Client Setup (Local ya server IP)
-qdrant_client = QdrantClient(host="127.0.0.1", port=6333, check_compatibility=False) 
-COLLECTION_NAME = "legal_knowledge"
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = settings.QDRANT_COLLECTION
+SPARSE_VECTOR_NAME = settings.SPARSE_VECTOR_NAME
+# Gemini embedding dims (PDFManager aur retrieval tool dono 768 use karte hain)
+DENSE_VECTOR_SIZE = 768
+def quantization_config(mode: str = None):
+    """QDRANT_QUANTIZATION -> Qdrant quantization config (None = plain float32)."""
+    mode = (mode or settings.QDRANT_QUANTIZATION).lower()
+    if mode == "scalar":
+        # float32 -> int8: ~4x kam RAM, rescore ke saath recall almost same
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=settings.QDRANT_SCALAR_QUANTILE,
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        ))
+    if mode == "binary":
+        # 1 bit/dim: ~32x kam RAM; 768 dims par oversampling + rescore zaroori
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+            always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM,
+        ))
+    if mode in ("", "none"):
+        return None
+    raise ValueError(f"Unknown QDRANT_QUANTIZATION '{mode}' (expected none/scalar/binary)")
+
+def collection_profile(quantization: str = None, on_disk: bool = None, hnsw_m: int = None,
+                       ef_construct: int = None) -> Dict:
+    """
+    create_collection kwargs for the legal_knowledge layout: dense vector
+    (optionally on disk), sparse BM25 vector, HNSW m/ef_construct and
+    optional scalar/binary quantization. Overrides default to settings.
+    """
+    return {
+        "vectors_config": models.VectorParams(
+            size=DENSE_VECTOR_SIZE,
+            distance=models.Distance.COSINE,
+            on_disk=settings.QDRANT_VECTORS_ON_DISK if on_disk is None else on_disk,
+        ),
+        "sparse_vectors_config": {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+        "hnsw_config": models.HnswConfigDiff(
+            m=hnsw_m or settings.QDRANT_HNSW_M,
+            ef_construct=ef_construct or settings.QDRANT_HNSW_EF_CONSTRUCT,
+            on_disk=settings.QDRANT_HNSW_ON_DISK,
+        ),
+        "quantization_config": quantization_config(quantization),
+    }
+
+# Filtered search (document / owner / page) inhi fields par hota hai
+PAYLOAD_INDEXES = {
+    "pdf_id": models.PayloadSchemaType.KEYWORD,
+    "document_name": models.PayloadSchemaType.KEYWORD,
+    "user_email": models.PayloadSchemaType.KEYWORD,
+    "page_num": models.PayloadSchemaType.INTEGER,
+    "page_start": models.PayloadSchemaType.INTEGER,
+    "page_end": models.PayloadSchemaType.INTEGER,
+}
+# Fixed namespace: same (pdf_id, page, chunk index) hamesha same point ID deta hai
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "points.juristway.com")
 
 
 # Check if running on Mac (Darwin) or Linux
@@ -150,102 +211,341 @@ IS_MAC = platform.system() == "Darwin"
 TESSERACT_PATH = r"/opt/local/bin/tesseract" if IS_MAC else r"/usr/bin/tesseract"     
 POPPLER_PATH = r"/opt/local/bin" if IS_MAC else r"/usr/bin"
 
-executor = ProcessPoolExecutor(max_workers=4)
+OCR_WORKERS = 4
+OCR_DPI = 150
+# Ek OCR task itne pages ki range handle karta hai (first_page/last_page)
+PAGE_BATCH_SIZE = 4
+# Text layer mein itne alphanumeric chars se kam hon toh page ko image-only maante hain
+MIN_NATIVE_TEXT_CHARS = 40
+
+executor = ProcessPoolExecutor(max_workers=OCR_WORKERS)
 
 def ocr_worker(args):
-    page_number, image = args
+    """
+    Rasterizes and OCRs a bounded page range inside the worker process.
+    Pages are rendered one at a time and released right after OCR, so only
+    text is pickled back and a worker never holds more than one page image.
+    """
+    pdf_path, first_page, last_page = args
     pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-    text = pytesseract.image_to_string(image, lang="eng", config="--oem 3 --psm 6")
-    return {"page": page_number, "text": text.strip()}
+    pages = []
+    for page_number in range(first_page, last_page + 1):
+        images = convert_from_path(
+            pdf_path,
+            dpi=OCR_DPI,
+            first_page=page_number,
+            last_page=page_number,
+            poppler_path=POPPLER_PATH,
+        )
+        if not images:
+            continue
+        image = images[0]
+        try:
+            text = pytesseract.image_to_string(image, lang="eng", config="--oem 3 --psm 6")
+        finally:
+            image.close()
+        pages.append({"page": page_number, "text": text.strip()})
+    return pages
+
+def extract_text_layer(pdf_path: str) -> List[str]:
+    """
+    Returns the embedded text of every page using poppler's pdftotext
+    (same poppler install that pdf2image already needs). pdftotext separates
+    pages with a form feed, so index i holds the text of page i + 1.
+    """
+    pdftotext = os.path.join(POPPLER_PATH, "pdftotext")
+    result = subprocess.run(
+        [pdftotext, "-layout", "-enc", "UTF-8", pdf_path, "-"],
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout.decode("utf-8", errors="ignore").split("\f")
+
+def has_usable_text(text: str) -> bool:
+    return sum(ch.isalnum() for ch in text) >= MIN_NATIVE_TEXT_CHARS
 
 class PDFManager:
-    def __init__(self, overlap_ratio: float = 0.2):
-        self.overlap_ratio = overlap_ratio
+    def __init__(self, chunker: LegalChunker = None, page_batch_size: int = PAGE_BATCH_SIZE):
+        # Section/clause aware, token-bounded chunks (CHUNK_* settings)
+        self.chunker = chunker or LegalChunker()
+        self.page_batch_size = max(1, page_batch_size)
         # Gemini Embedding Setup (3072 dims)
-        self.client = QdrantClient(host="127.0.0.1", port=6333, check_compatibility=False)
-        self.collection_name = "legal_knowledge"
+        self.client = get_qdrant_client()
+        self.collection_name = COLLECTION_NAME
         self.embeddings = GoogleGenerativeAIEmbeddings(
             model="models/gemini-embedding-001", # Latest optimized model
             google_api_key=settings.GEMINI_API_KEY,
             output_dimensionality=768,
         )
+        cache = EmbeddingCache.for_embeddings(self.embeddings) if settings.EMBED_CACHE_ENABLED else None
+        self.embedder = BatchEmbedder(self.embeddings, cache=cache)
+        self._kb_indexes_ready = False
+
+    def _page_ranges(self, page_numbers: List[int]):
+        """Groups page numbers into consecutive runs of at most page_batch_size."""
+        run = []
+        for page_number in page_numbers:
+            if run and (page_number != run[-1] + 1 or len(run) >= self.page_batch_size):
+                yield run[0], run[-1]
+                run = []
+            run.append(page_number)
+        if run:
+            yield run[0], run[-1]
+
+    def _ocr_pages(self, pdf_path: str, page_numbers: List[int]) -> List[Dict]:
+        """
+        Streaming OCR: poori PDF ek saath rasterize nahi hoti. Page ranges workers
+        ko bheji jaati hain aur in-flight ranges bounded rehti hain, isliye peak
+        memory page count ke saath nahi badhti.
+        """
+        max_in_flight = OCR_WORKERS * 2
+
+        pages = []
+        pending = set()
+        for first_page, last_page in self._page_ranges(page_numbers):
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pages.extend(future.result())
+            pending.add(executor.submit(ocr_worker, (pdf_path, first_page, last_page)))
+
+        for future in as_completed(pending):
+            pages.extend(future.result())
+        return pages
+
+    def extract_pages(self, pdf_path: str) -> List[Dict]:
+        """
+        Born-digital pages ka text seedha text layer se lete hain; Tesseract sirf
+        un pages par chalta hai jinka text layer khaali ya bekaar hai.
+        Har page dict mein "source" ("text" / "ocr") bhi hota hai.
+        """
+        page_count = pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"]
+        try:
+            native_texts = extract_text_layer(pdf_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️ Text layer extraction failed for {pdf_path}, falling back to OCR: {e}")
+            native_texts = []
+
+        pages = []
+        ocr_needed = []
+        for page_number in range(1, page_count + 1):
+            text = native_texts[page_number - 1] if page_number <= len(native_texts) else ""
+            if has_usable_text(text):
+                pages.append({"page": page_number, "text": text.strip(), "source": "text"})
+            else:
+                ocr_needed.append(page_number)
+
+        for page in self._ocr_pages(pdf_path, ocr_needed):
+            page["source"] = "ocr"
+            pages.append(page)
 
-    def process_pdf(self, pdf_path: str) -> List[Dict]:
-        images = convert_from_path(pdf_path, dpi=150, poppler_path=POPPLER_PATH)
-        tasks = [(i + 1, img) for i, img in enumerate(images)]
-        
-        futures = [executor.submit(ocr_worker, t) for t in tasks]
-        pages = [f.result() for f in as_completed(futures)]
         pages.sort(key=lambda x: x["page"])
-        
-        return self._chunk_pages(pages)
+        return pages
+
+    @staticmethod
+    def page_stats(pages: List[Dict]) -> Dict:
+        """Per-document aur per-page extraction stats, 'documents' record ke liye."""
+        per_page = [
+            {"page": p["page"], "source": p["source"], "chars": len(p["text"])}
+            for p in pages
+        ]
+        return {
+            "total_pages": len(pages),
+            "native_pages": sum(1 for p in pages if p["source"] == "text"),
+            "ocr_pages": sum(1 for p in pages if p["source"] == "ocr"),
+            "empty_pages": sum(1 for p in pages if not p["text"]),
+            "pages": per_page,
+        }
+
+    def process_pdf(self, pdf_path: str) -> List[Dict]:
+        return self._chunk_pages(self.extract_pages(pdf_path))
 
     def _chunk_pages(self, pages: List[Dict]) -> List[Dict]:
-        chunks = []
-        for i, page in enumerate(pages):
-            text = page["text"]
-            if not text.strip(): continue
-            
-            if i + 1 < len(pages):
-                next_text = pages[i + 1]["text"]
-                overlap_len = int(len(next_text) * self.overlap_ratio)
-                text += "\n" + next_text[:overlap_len]
-            
-            chunks.append({
-                "text": text, 
-                "page_num": page["page"]
-            })
-        return chunks
+        # Har chunk: text, page_num (= page_start), page_start, page_end, section, token_count
+        return self.chunker.chunk_pages(pages)
     
-    def _setup_qdrant(self):
-        """Collection create karne ka logic agar wo nahi hai toh"""
+    async def setup_qdrant(self):
+        """
+        Collection create karne ka logic agar wo nahi hai toh. Existing collection mein
+        naya sparse vector add nahi ho sakta (Qdrant sirf existing sparse vectors update
+        karta hai), isliye purani dense-only collection ko migrate_collection.py se
+        alias ke peeche rebuild karna padta hai; tab tak ingestion dense-only likhta hai.
+        Missing payload indexes bhi bana deta hai, taaki filtered search filterable HNSW use kare.
+        """
+        client = get_async_qdrant_client()
         try:
-            collections = self.client.get_collections()
-            exists = any(c.name == self.collection_name for c in collections.collections)
-            
-            if not exists:
-                logger.info(f"Creating collection: {self.collection_name}")
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    # Gemini ke liye size 768 hi rakhna!
-                    vectors_config=models.VectorParams(size=768, distance=models.Distance.COSINE),
-                )
+            if not await self.collection_or_alias_exists(self.collection_name):
+                logger.info(f"Creating collection: {self.collection_name} (quantization={settings.QDRANT_QUANTIZATION})")
+                # Gemini ke liye size 768 hi rakhna! (default unnamed dense vector)
+                await client.create_collection(collection_name=self.collection_name, **collection_profile())
                 logger.info(f"✅ Collection {self.collection_name} created successfully!")
             else:
-                logger.info(f"ℹ️ Collection {self.collection_name} already exists.")
+                info = await client.get_collection(self.collection_name)
+                if SPARSE_VECTOR_NAME not in (info.config.params.sparse_vectors or {}):
+                    logger.warning(
+                        f"⚠️ {self.collection_name} has no sparse vector '{SPARSE_VECTOR_NAME}': hybrid search "
+                        f"is off and chunks are stored dense-only. Run migrate_collection.py to rebuild it."
+                    )
+                else:
+                    logger.info(f"ℹ️ Collection {self.collection_name} already exists.")
+
+            await self._ensure_payload_indexes()
         except Exception as e:
             logger.error(f"❌ Failed to setup Qdrant collection: {e}")
 
+    @staticmethod
+    async def collection_or_alias_exists(name: str) -> bool:
+        """migrate_collection.py ke baad legal_knowledge ek alias hota hai, collection nahi."""
+        client = get_async_qdrant_client()
+        if await client.collection_exists(name):
+            return True
+        aliases = await client.get_aliases()
+        return any(a.alias_name == name for a in aliases.aliases)
 
-    async def save_to_mongo_and_qdrant(self, pdf_path: str, document_name: str, user_email: str, pdf_id: str = None):
-        # 1. OCR (CPU Task)
-        loop = asyncio.get_event_loop()
-        chunks = await loop.run_in_executor(None, self.process_pdf, pdf_path)
-        
-        if not chunks:
-            return 0
+    async def _ensure_payload_indexes(self, collection_name: str = None):
+        client = get_async_qdrant_client()
+        collection_name = collection_name or self.collection_name
+        info = await client.get_collection(collection_name)
+        existing = info.payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            await client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=schema,
+                wait=True,
+            )
+            logger.info(f"✅ Payload index on '{field_name}' ({schema.value}) created")
+
+
+    async def delete_document_chunks(self, pdf_id: str) -> int:
+        """Ek PDF ke purane chunks hata deta hai: Qdrant points aur knowledge_base rows dono."""
+        await get_async_qdrant_client().delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(must=[
+                    models.FieldCondition(key="pdf_id", match=models.MatchValue(value=pdf_id))
+                ])
+            ),
+        )
+        result = await get_knowledge_base_collection().delete_many({"pdf_id": pdf_id})
+        await invalidate_semantic_cache()
+        return result.deleted_count
+
+    async def delete_stale_chunks(self, pdf_id: str, keep_point_ids: List[str], written_since: datetime) -> int:
+        """
+        Re-ingest ke baad: PDF ke woh Qdrant points jo keep_point_ids mein nahi hain, aur
+        written_since se pehle ke knowledge_base rows hatata hai. Naya data pehle likha
+        jata hai, isliye beech mein fail hone par document bina chunks ke nahi rehta.
+        """
+        await get_async_qdrant_client().delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[models.FieldCondition(key="pdf_id", match=models.MatchValue(value=pdf_id))],
+                    must_not=[models.HasIdCondition(has_id=keep_point_ids)] if keep_point_ids else [],
+                )
+            ),
+        )
+        result = await get_knowledge_base_collection().delete_many(
+            {"pdf_id": pdf_id, "timestamp": {"$not": {"$gte": written_since}}}
+        )
+        await invalidate_semantic_cache()
+        return result.deleted_count
+
+    async def point_ids_written_since(self, pdf_id: str, since: datetime) -> List[str]:
+        """Is ingest run mein likhe gaye knowledge_base rows ke point IDs (delete_stale_chunks ke liye)."""
+        return await get_knowledge_base_collection().distinct(
+            "point_id", {"pdf_id": pdf_id, "timestamp": {"$gte": since}}
+        )
+
+    async def _ensure_kb_indexes(self, coll):
+        if self._kb_indexes_ready:
+            return
+        # store() har row ko point_id par upsert karta hai; stale cleanup pdf_id + timestamp par
+        await coll.create_index("point_id")
+        await coll.create_index([("pdf_id", 1), ("timestamp", 1)])
+        self._kb_indexes_ready = True
+
+    @staticmethod
+    def point_id(pdf_id: str, page_num: int, chunk_index: int) -> str:
+        """Deterministic point ID, taaki retry/reindex same points ko overwrite kare, duplicate na bane."""
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{pdf_id}:{page_num}:{chunk_index}"))
+
+    async def _upsert_points(self, points: List[models.PointStruct]):
+        """
+        Points ko sized batches mein AsyncQdrantClient se bhejta hai, kuch requests
+        parallel in-flight. wait=False: Qdrant WAL mein likhte hi ack kar deta hai,
+        indexing background mein hoti hai.
+        """
+        client = get_async_qdrant_client()
+        batch_size = max(1, settings.QDRANT_UPSERT_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, settings.QDRANT_UPSERT_CONCURRENCY))
+
+        async def send(batch):
+            async with semaphore:
+                await client.upsert(collection_name=self.collection_name, points=batch, wait=False)
 
-        # 2. Embeddings generate karein
-        texts = [c["text"] for c in chunks]
-        vectors = await loop.run_in_executor(None, self.embeddings.embed_documents, texts)
+        await asyncio.gather(*(
+            send(points[i:i + batch_size]) for i in range(0, len(points), batch_size)
+        ))
 
-        # 3. Prepare Data for Qdrant (Vector DB)
+    # --- Ingestion steps (workers/pipeline.py inhe alag stages mein chalata hai) ---
+
+    async def extract(self, pdf_path: str, pdf_id: str, document_name: str) -> List[Dict]:
+        """Step 1: text layer + OCR fallback, page stats 'documents' record mein."""
+        # OCR process pool mein, text layer + orchestration ek thread mein (event loop free rehta hai)
+        loop = asyncio.get_running_loop()
+        pages = await loop.run_in_executor(None, self.extract_pages, pdf_path)
+        stats = self.page_stats(pages)
+        print(
+            f"📄 '{document_name}': {stats['native_pages']} text-layer pages, "
+            f"{stats['ocr_pages']} OCR pages, {stats['empty_pages']} empty"
+        )
+        await get_documents_collection().update_one(
+            {"pdf_id": pdf_id},
+            {"$set": {"page_stats": stats}}
+        )
+        return pages
+
+    def chunk(self, pages: List[Dict]) -> List[Dict]:
+        """Step 2: pages -> chunks."""
+        return self._chunk_pages(pages)
+
+    async def embed_chunks(self, chunks: List[Dict], user_email: str) -> List[List[float]]:
+        """Step 3: embeddings (batched, bounded concurrency, per-batch retry)."""
+        # Embedding tokens document owner ke naam par account hote hain
+        set_usage_context(user_email, "ingestion")
+        return await self.embedder.embed_documents([c["text"] for c in chunks])
+
+    def build_records(self, pdf_id: str, document_name: str, user_email: str,
+                      chunks: List[Dict], vectors: List[List[float]], with_sparse: bool = True):
+        """
+        Qdrant points aur knowledge_base docs, same deterministic point IDs ke saath.
+        with_sparse=False: collection mein abhi BM25 vector config nahi hai (sparse_vector_available).
+        """
         points = []
         mongo_docs = []
-        pdf_id = str(uuid.uuid4()) # Unique ID for this PDF
 
         for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
-            point_id = str(uuid.uuid4())
+            point_id = self.point_id(pdf_id, chunk["page_num"], i)
             
-            # Data for Qdrant
+            # Data for Qdrant: dense (default "") + sparse BM25 vector
+            point_vector = {"": vector}
+            if with_sparse:
+                point_vector[SPARSE_VECTOR_NAME] = sparse_encoder.encode_document(chunk["text"])
             points.append(models.PointStruct(
                 id=point_id,
-                vector=vector,
+                vector=point_vector,
                 payload={
                     "pdf_id": pdf_id,
                     "document_name": document_name,
                     "text": chunk["text"],
                     "page_num": chunk["page_num"],
+                    "page_start": chunk["page_start"],
+                    "page_end": chunk["page_end"],
+                    "section": chunk["section"],
                     "user_email": user_email
                 }
             ))
@@ -257,16 +557,49 @@ class PDFManager:
                 "document_name": document_name,
                 "text": chunk["text"],
                 "page_num": chunk["page_num"],
+                "page_start": chunk["page_start"],
+                "page_end": chunk["page_end"],
+                "section": chunk["section"],
+                "token_count": chunk["token_count"],
                 "user_email": user_email,
                 "timestamp": datetime.now(timezone.utc)
             })
+        return points, mongo_docs
 
-        # 4. Save to Qdrant
-        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+    async def store(self, points: List[models.PointStruct], mongo_docs: List[Dict]):
+        """
+        Step 4: Qdrant upsert + knowledge_base upsert + semantic cache invalidation.
+        Dono side point_id par idempotent hain: retry ya lease kho chuke worker ka
+        late store duplicate rows nahi banata.
+        """
+        # Save to Qdrant (batched, parallel, idempotent IDs)
+        await self._upsert_points(points)
 
-        # 5. Save to MongoDB
+        # Save to MongoDB (replace-or-insert by point_id)
         collection = get_knowledge_base_collection()
-        await collection.insert_many(mongo_docs)
+        await self._ensure_kb_indexes(collection)
+        if mongo_docs:
+            await collection.bulk_write(
+                [ReplaceOne({"point_id": doc["point_id"]}, doc, upsert=True) for doc in mongo_docs],
+                ordered=False,
+            )
+
+        # Corpus badal gaya, purane cached answers ab stale ho sakte hain
+        await invalidate_semantic_cache()
+
+    async def save_to_mongo_and_qdrant(self, pdf_path: str, document_name: str, user_email: str, pdf_id: str = None):
+        pdf_id = pdf_id or str(uuid.uuid4()) # Unique ID for this PDF
+
+        pages = await self.extract(pdf_path, pdf_id, document_name)
+        chunks = self.chunk(pages)
+        if not chunks:
+            return 0
+
+        vectors = await self.embed_chunks(chunks, user_email)
+        points, mongo_docs = self.build_records(
+            pdf_id, document_name, user_email, chunks, vectors, with_sparse=await sparse_vector_available()
+        )
+        await self.store(points, mongo_docs)
         
         print(f"✅ Document '{document_name}' processed: {len(chunks)} chunks saved.")
-        return len(chunks)
\ No newline at end of file
+        return len(chunks)
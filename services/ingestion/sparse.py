@@ -0,0 +1,99 @@
+import logging
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client.http import models
+
+from core.config import settings
+from core.database import get_async_qdrant_client
+
+logger = logging.getLogger(__name__)
+
+# Collection mein sparse vector hai ya nahi, ye check har minute se zyada nahi
+SPARSE_CHECK_INTERVAL_SECONDS = 60
+_sparse_state = {"available": False, "checked_at": 0.0}
+
+# Encoder logic badle toh bump karo (reindex.py manifest compare karta hai)
+SPARSE_ENCODER_VERSION = "bm25-v1"
+
+# "s.138", "12a", "2019", "ni" sab alag tokens; punctuation drop
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+shall may any such which who whom whose under said
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased alphanumeric tokens minus stopwords, plus a bigram for every
+    token that carries a digit ("section_138", "article_21", "138_ni"), so
+    statute/section references score as a unit and not as two common words.
+    """
+    raw = TOKEN_RE.findall(text.lower())
+    tokens = [t for t in raw if t not in STOPWORDS]
+    bigrams = []
+    for prev, tok in zip(raw, raw[1:]):
+        if any(ch.isdigit() for ch in prev + tok) and prev not in STOPWORDS and tok not in STOPWORDS:
+            bigrams.append(f"{prev}_{tok}")
+    return tokens + bigrams
+
+
+def _index(token: str) -> int:
+    # Hashing trick: koi vocabulary store nahi karni padti (uint32 index space)
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _to_sparse(weights: Dict[int, float]) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+class BM25SparseEncoder:
+    """
+    BM25-style sparse vectors for Qdrant. Documents carry the saturated,
+    length-normalised term frequency; IDF is applied server-side by the
+    collection's Modifier.IDF, so corpus statistics never go stale.
+    Queries use a weight of 1 per distinct term.
+    """
+
+    def __init__(self, k1: float = None, b: float = None, avg_doc_tokens: float = None):
+        self.k1 = settings.BM25_K1 if k1 is None else k1
+        self.b = settings.BM25_B if b is None else b
+        self.avg_doc_tokens = avg_doc_tokens or settings.BM25_AVG_DOC_TOKENS
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        tokens = tokenize(text)
+        length_norm = 1 - self.b + self.b * (len(tokens) / self.avg_doc_tokens)
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            idx = _index(token)
+            # Hash collision par weights add ho jate hain
+            weights[idx] = weights.get(idx, 0.0) + tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        return _to_sparse(weights)
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        return _to_sparse({_index(token): 1.0 for token in set(tokenize(text))})
+
+
+async def sparse_vector_available() -> bool:
+    """
+    True once QDRANT_COLLECTION has the sparse BM25 vector config. Purani
+    collection (migrate_collection.py se pehle) par False: search dense-only
+    chalti hai aur ingestion sparse vector nahi likhta.
+    """
+    if _sparse_state["available"] or time.monotonic() - _sparse_state["checked_at"] < SPARSE_CHECK_INTERVAL_SECONDS:
+        return _sparse_state["available"]
+    _sparse_state["checked_at"] = time.monotonic()
+    try:
+        info = await get_async_qdrant_client().get_collection(settings.QDRANT_COLLECTION)
+        _sparse_state["available"] = settings.SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    except Exception as e:
+        logger.warning(f"⚠️ Could not inspect {settings.QDRANT_COLLECTION} for sparse vectors: {e}")
+    return _sparse_state["available"]
+
+
+sparse_encoder = BM25SparseEncoder()
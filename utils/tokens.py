@@ -0,0 +1,9 @@
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for Gemini models (~4 characters per token).
+    Good enough for throughput reporting and context budgeting, where an
+    exact tokenizer round-trip would cost more than it saves.
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
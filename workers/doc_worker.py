@@ -1,74 +1,141 @@
+import argparse
 import asyncio
 import logging
-from services.background.queue_mgr import document_queue
-from services.ingestion.pdf_engine import PDFManager
-from core.database import get_documents_collection
+import signal
+
+from core.config import settings
+from core.database import close_mongo_connection, close_qdrant_clients, close_redis_client, connect_to_mongo
+from services.background.processor import mark_document_failed, pdf_manager, process_document_job
+from services.background.queue_mgr import (
+    INGEST_DOCUMENT,
+    claim_job,
+    complete_job,
+    default_worker_id,
+    ensure_job_indexes,
+    fail_job,
+    heartbeat,
+    reap_expired_jobs,
+)
+from services.background.usage_writer import usage_writer
+from workers.pipeline import IngestionPipeline
 from dotenv import load_dotenv
 load_dotenv()
 # Setup logging to see what's happening in the background
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger("DocumentWorker")
 
-async def document_worker(queue: asyncio.Queue, vector_store):
-    """
-    The background engine that processes PDFs from the queue.
-    """
-    pdf_manager = PDFManager()
-    logger.info("🚀 Document Worker started and waiting for jobs...")
-
-    while True:
-        # 1. Wait for a job from the queue
-        job_data = await queue.get()
-        
+# Usage: python -m workers.doc_worker --concurrency 4
+# --concurrency = documents in flight; har stage ki apni limit PIPELINE_* settings mein.
+# Throughput badhane ke liye aur worker processes chalao; jobs lease se bante hain.
+
+pipeline: IngestionPipeline = None
+
+
+async def run_job(job: dict):
+    payload = job["payload"]
+    await process_document_job(
+        payload["file_path"],
+        payload["pdf_id"],
+        payload["title"],
+        payload["owner_email"],
+        attempt=job["attempts"],
+        ingest=pipeline.ingest,
+    )
+
+
+async def _keep_lease(job: dict, worker_id: str, task: asyncio.Task):
+    """Lease ko zinda rakhta hai; lease chhin jaye toh apna kaam cancel (duplicate processing nahi)."""
+    interval = max(settings.JOB_LEASE_SECONDS / 3, 1)
+    while not task.done():
+        await asyncio.sleep(interval)
+        if not await heartbeat(job["_id"], worker_id):
+            logger.warning(f"⚠️ Lease lost for job {job['_id']}, cancelling")
+            task.cancel()
+            return
+
+
+async def handle_job(job: dict, worker_id: str):
+    pdf_id = job["payload"].get("pdf_id")
+    logger.info(f"📄 Job {job['_id']} attempt {job['attempts']}/{job['max_attempts']} (pdf {pdf_id})")
+    task = asyncio.create_task(run_job(job))
+    lease_keeper = asyncio.create_task(_keep_lease(job, worker_id, task))
+    try:
+        await task
+        await complete_job(job["_id"], worker_id)
+    except asyncio.CancelledError:
+        # Lease lost: job doosre worker ke paas hai, kuch mark mat karo
+        if not lease_keeper.done():
+            raise
+    except Exception as e:
+        logger.error(f"❌ Job {job['_id']} failed: {e}")
+        if await fail_job(job, worker_id, str(e)):
+            await mark_document_failed(pdf_id, str(e))
+    finally:
+        lease_keeper.cancel()
+
+
+async def worker_slot(worker_id: str, stop: asyncio.Event):
+    while not stop.is_set():
+        job = await claim_job(worker_id, [INGEST_DOCUMENT])
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await handle_job(job, worker_id)
+
+
+async def reaper(stop: asyncio.Event):
+    """Final attempt par crash hue jobs ko dead + document failed mark karta hai."""
+    while not stop.is_set():
+        for job in await reap_expired_jobs():
+            logger.error(f"❌ Job {job['_id']} lease expired on final attempt")
+            await mark_document_failed(job["payload"].get("pdf_id"), job["last_error"])
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.JOB_LEASE_SECONDS / 2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def log_stats(stop: asyncio.Event):
+    while not stop.is_set():
         try:
-            file_id = job_data.get("file_id")
-            file_path = job_data.get("file_path")
-            logger.info(f"📄 Processing document: {job_data.get('filename')}")
-
-            # 2. Run the heavy OCR and Embedding (using run_in_executor to avoid blocking)
-            loop = asyncio.get_running_loop()
-            chunks = await loop.run_in_executor(
-                None, 
-                pdf_manager.process_pdf, 
-                file_path
-            )
-
-            # 3. Format chunks for the Vector Store
-            # We add the owner and file_id to each chunk so we can filter searches later
-            for chunk in chunks:
-                chunk["metadata"] = {
-                    "file_id": file_id,
-                    "owner": job_data.get("owner"),
-                    "filename": job_data.get("filename"),
-                    "page": chunk.get("page_num")
-                }
-
-            # 4. Save to Vector Store
-            # Note: We use the 'text' key expected by our MongoVectorStore wrapper
-            formatted_docs = [
-                {"text": c["chunk_text"], "embedding": c["embedding"], "metadata": c["metadata"]}
-                for c in chunks
-            ]
-            
-            await vector_store.collection.insert_many(formatted_docs)
-
-            # 5. Update the document status in the main library collection
-            await get_documents_collection().update_one(
-                {"file_id": file_id},
-                {"$set": {"status": "completed"}}
-            )
-            
-            logger.info(f"✅ Successfully processed and indexed: {job_data.get('filename')}")
-
-        except Exception as e:
-            logger.error(f"❌ Error processing document {job_data.get('filename')}: {str(e)}")
-            # Update status to failed so the user knows
-            if job_data.get("file_id"):
-                await get_documents_collection().update_one(
-                    {"file_id": job_data.get("file_id")},
-                    {"$set": {"status": "failed", "error": str(e)}}
-                )
-        
-        finally:
-            # 6. Mark the task as done in the queue
-            queue.task_done()
\ No newline at end of file
+            await asyncio.wait_for(stop.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            logger.info(f"📊 Pipeline stages: {pipeline.stats()}")
+
+
+async def main(concurrency: int):
+    global pipeline
+    await connect_to_mongo()
+    await ensure_job_indexes()
+    # Same PDFManager (aur uska embedder semaphore) jo processor use karta hai
+    pipeline = IngestionPipeline(pdf_manager)
+    await pdf_manager.setup_qdrant()
+    pipeline.start()
+
+    worker_id = default_worker_id()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Naye jobs claim karna band, chal rahe jobs poore hone do
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"🚀 Document Worker {worker_id} started with {concurrency} slot(s)")
+    await asyncio.gather(reaper(stop), log_stats(stop), *(worker_slot(worker_id, stop) for _ in range(concurrency)))
+
+    await pipeline.stop()
+    await usage_writer.stop()
+    await close_mongo_connection()
+    await close_qdrant_clients()
+    await close_redis_client()
+    logger.info("✅ Document Worker stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Durable ingestion queue worker")
+    parser.add_argument("--concurrency", type=int, default=settings.DOC_WORKER_CONCURRENCY,
+                        help="Documents in flight through the pipeline in this process")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
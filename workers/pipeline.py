@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from services.ingestion.pdf_engine import PDFManager
+from services.ingestion.sparse import sparse_vector_available
+
+logger = logging.getLogger("IngestionPipeline")
+
+# Stage layout: extract (OCR process pool) -> chunk -> embed (asyncio) -> upsert (asyncio)
+# Har stage ke beech bounded asyncio.Queue hai: downstream slow ho toh upstream
+# khud ruk jata hai (backpressure), aur kai documents ek saath alag stages mein rehte hain.
+
+
+@dataclass
+class DocumentTask:
+    pdf_path: str
+    pdf_id: str
+    document_name: str
+    user_email: str
+    future: asyncio.Future
+    pages: List[Dict] = field(default_factory=list)
+    chunks: List[Dict] = field(default_factory=list)
+    vectors: List[List[float]] = field(default_factory=list)
+
+
+class Stage:
+    """One pipeline stage: `concurrency` worker tasks pulling from a bounded inbox."""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int,
+                 handler: Callable[[DocumentTask], Awaitable[bool]]):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.handler = handler
+        self.next: Optional["Stage"] = None
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            task = await self.inbox.get()
+            self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                if task.future.done():
+                    continue
+                forward = await self.handler(task)
+                self.processed += 1
+                if forward and self.next is not None:
+                    # Agla stage full hai toh yahin wait (backpressure)
+                    await self.next.inbox.put(task)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Stage '{self.name}' failed for {task.document_name}: {e}")
+                if not task.future.done():
+                    task.future.set_exception(e)
+            finally:
+                self.busy_seconds += time.perf_counter() - started
+                self.in_flight -= 1
+                self.inbox.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queued": self.inbox.qsize(),
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 1),
+        }
+
+
+class IngestionPipeline:
+    """
+    Pipelined document ingestion with per-stage concurrency. `ingest()` has the
+    same signature as PDFManager.save_to_mongo_and_qdrant, so job handlers can
+    use either one.
+    """
+
+    def __init__(self, pdf_manager: Optional[PDFManager] = None,
+                 extract_concurrency: int = None, chunk_concurrency: int = None,
+                 embed_concurrency: int = None, upsert_concurrency: int = None,
+                 queue_size: int = None):
+        self.pdf_manager = pdf_manager or PDFManager()
+        queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.stages = [
+            Stage("extract", extract_concurrency or settings.PIPELINE_EXTRACT_CONCURRENCY, queue_size, self._extract),
+            Stage("chunk", chunk_concurrency or settings.PIPELINE_CHUNK_CONCURRENCY, queue_size, self._chunk),
+            Stage("embed", embed_concurrency or settings.PIPELINE_EMBED_CONCURRENCY, queue_size, self._embed),
+            Stage("upsert", upsert_concurrency or settings.PIPELINE_UPSERT_CONCURRENCY, queue_size, self._upsert),
+        ]
+        for stage, nxt in zip(self.stages, self.stages[1:]):
+            stage.next = nxt
+        self._started = False
+
+    def start(self):
+        if not self._started:
+            for stage in self.stages:
+                stage.start()
+            self._started = True
+
+    async def stop(self):
+        for stage in self.stages:
+            await stage.stop()
+        self._started = False
+
+    async def ingest(self, pdf_path: str, document_name: str, user_email: str, pdf_id: str) -> int:
+        self.start()
+        task = DocumentTask(
+            pdf_path=pdf_path,
+            pdf_id=pdf_id,
+            document_name=document_name,
+            user_email=user_email,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        await self.stages[0].inbox.put(task)
+        return await task.future
+
+    # --- Stage handlers: True = agle stage ko forward karo ---
+
+    async def _extract(self, task: DocumentTask) -> bool:
+        task.pages = await self.pdf_manager.extract(task.pdf_path, task.pdf_id, task.document_name)
+        return True
+
+    async def _chunk(self, task: DocumentTask) -> bool:
+        loop = asyncio.get_running_loop()
+        task.chunks = await loop.run_in_executor(None, self.pdf_manager.chunk, task.pages)
+        task.pages = []
+        if not task.chunks:
+            self._resolve(task, 0)
+            return False
+        return True
+
+    async def _embed(self, task: DocumentTask) -> bool:
+        task.vectors = await self.pdf_manager.embed_chunks(task.chunks, task.user_email)
+        return True
+
+    async def _upsert(self, task: DocumentTask) -> bool:
+        points, mongo_docs = self.pdf_manager.build_records(
+            task.pdf_id, task.document_name, task.user_email, task.chunks, task.vectors,
+            with_sparse=await sparse_vector_available(),
+        )
+        await self.pdf_manager.store(points, mongo_docs)
+        print(f"✅ Document '{task.document_name}' processed: {len(task.chunks)} chunks saved.")
+        self._resolve(task, len(task.chunks))
+        return False
+
+    @staticmethod
+    def _resolve(task: DocumentTask, value: int):
+        # Caller cancel ho chuka ho (e.g. job lease lost) toh future already done hai
+        if not task.future.done():
+            task.future.set_result(value)
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}